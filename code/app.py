@@ -7,13 +7,14 @@ import numpy as np
 import joblib
 import facer
 from fb import get_db
-from sklearn.cluster import KMeans
-from flask import Flask, request, jsonify, render_template, send_from_directory, session, send_file
+from flask import Flask, request, jsonify, render_template, send_from_directory, session, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import base64
 from io import BytesIO
 import json
 import ssl
+import hmac
+import uuid
 import time
 import albumentations as A
 from scipy import ndimage
@@ -25,8 +26,19 @@ from fpdf import FPDF
 
 # 가상 메이크업 기능에 필요한 import
 from torchvision import transforms
-from model import BiSeNet  # kaka 프로젝트의 model.py
-from makeup import hair   # kaka 프로젝트의 makeup.py
+from model import load_inference_model  # kaka 프로젝트의 model.py
+from bisenet_backends import load_bisenet
+from runtime import apply_thread_budget, available_cpus, format_runtime_info, runtime_info, thread_budget
+from makeup import apply_makeup, DEFAULT_INTENSITY   # kaka 프로젝트의 makeup.py
+from parsing_cache import ParsingCache, content_hash, farl_to_bisenet
+from face_roi import (FACE_CROP_MAX_AREA, compact_box, compose_parsing, crop_area_ratio, face_crop_box,
+                      fill_background)
+from batching import MicroBatcher
+from jobs import JobManager, JobQueueFull, ANALYSIS_STAGES
+from metrics import MetricsRegistry, set_endpoint
+from quantizer import skin_color_centers
+from classifier import PersonalColorClassifier
+from model_registry import ModelRegistry
 
 # ==============================================================================
 # SSL 인증서 오류 해결 (facer 모델 다운로드용)
@@ -46,11 +58,85 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'webp'}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# 얼굴 파싱 마스크 캐시 설정 (업로드 이미지 내용 해시 기준)
+app.config['PARSING_CACHE_FOLDER'] = os.path.join(app.root_path, 'cache', 'parsing')
+app.config['PARSING_CACHE_BYTES'] = 256 * 1024 * 1024        # 메모리 (원본 크기 라벨 맵)
+app.config['PARSING_CACHE_DISK_BYTES'] = 1024 * 1024 * 1024  # 디스크 (.npz 압축 사본)
+
+# /analyze의 facer 분할 결과를 BiSeNet 파트 번호로 바꿔 업로드와 함께 파싱 캐시에 저장
+# (FaRL은 얼굴 주변만 분할하므로 첫 /makeover, /apply_makeup_realtime 에서는 그 밖의 머리카락·옷만
+#  PARSE_COARSE_SIZE 크기의 BiSeNet 전체 사진 파싱으로 채움, '0'이면 사용 안 함)
+app.config['REUSE_ANALYSIS_PARSING'] = os.getenv('REUSE_ANALYSIS_PARSING', '1') == '1'
+
+# 가상 메이크업 BiSeNet 파싱 영역 ('full': 사진 전체를 512x512로, 'face': 얼굴 주변을 512x512로 파싱하고
+# 옷 등 나머지는 PARSE_COARSE_SIZE 크기의 전체 사진 파싱으로 채움, face_roi.py 참고)
+app.config['PARSE_REGION'] = os.getenv('PARSE_REGION', 'full')
+app.config['PARSE_COARSE_SIZE'] = 256
+# 얼굴 영역 파싱에서 얼굴 검출에 쓰는 사진의 최대 긴 변
+app.config['PARSE_DETECT_MAX_SIDE'] = 640
+
+# 가상 메이크업 BiSeNet 실행 백엔드 ('eager': PyTorch, 'fused': BatchNorm 접기 + channels_last,
+# 'torchscript', 'onnx': ONNX Runtime CPU, 'int8': 정적 양자화). 내보낸 파일이 없으면 eager로 실행합니다.
+# 'fused'/'torchscript'/'onnx'는 python bisenet_backends.py export 로 내보낸 뒤 parity 로 일치율을 확인하세요.
+# 'int8'은 python quantize_bisenet.py calibrate 로 만든 뒤 report 로 파트별 IoU를 확인하세요.
+app.config['BISENET_BACKEND'] = os.getenv('BISENET_BACKEND', 'eager')
+
+# 동시 요청의 BiSeNet 파싱을 모아서 한 번에 추론 (최대 배치 크기, 최대 대기 시간)
+app.config['PARSE_BATCH_SIZE'] = 8
+app.config['PARSE_BATCH_WAIT_MS'] = 5
+
+# 동시 /analyze 요청의 facer 얼굴 검출·파싱 배치 설정
+app.config['ANALYZE_BATCH_SIZE'] = 8
+app.config['ANALYZE_BATCH_WAIT_MS'] = 10
+
+# 비동기 분석 작업 설정 (워커 수, 최대 대기 작업 수, 완료된 작업 보관 시간)
+app.config['ANALYSIS_WORKERS'] = 2
+app.config['ANALYSIS_MAX_PENDING'] = 32
+app.config['ANALYSIS_JOB_TTL'] = 600
+# 진행 상황 SSE 스트림의 최대 유지 시간(초). 스트림은 gunicorn 워커 스레드 하나를 차지하므로
+# 이 시간이 지나면 연결을 닫고, 클라이언트는 상태 조회(폴링)로 전환합니다.
+app.config['ANALYSIS_EVENTS_MAX_SECONDS'] = 60
+
+# 조명 보정 해상도 ('full': 원본 크기에서 보정, 'analysis': 448x448 분석 이미지에서 보정)
+# 및 구현 ('reference': 기존 파이프라인, 'lab': LAB 변환 한 번으로 처리하는 빠른 파이프라인)
+# 기본값 외로 전환 전 validate_analysis.py lighting 으로 진단 결과 일치율을 확인하세요.
+app.config['LIGHTING_RESOLUTION'] = os.getenv('LIGHTING_RESOLUTION', 'full')
+app.config['LIGHTING_PIPELINE'] = os.getenv('LIGHTING_PIPELINE', 'reference')
+
+# 피부 대표색 추출 방식 ('sklearn': 요청마다 KMeans 학습, 'fast': quantizer.py의 결정적 양자화기)
+# 'fast' 전환 전 validate_analysis.py quantizer 로 진단 결과 일치율을 확인하세요.
+app.config['SKIN_QUANTIZER'] = os.getenv('SKIN_QUANTIZER', 'sklearn')
+
+# 퍼스널 컬러 분류 방식 ('sklearn': scaler.transform + kmeans_model.predict,
+# 'fast': classifier.py의 근사 NumPy 분류기, 클러스터 경계 근처의 점에서는 sklearn과 라벨이 다를 수 있음)
+# 'fast' 전환 전 validate_analysis.py classifier 로 일치율을 확인하세요.
+app.config['PERSONAL_COLOR_CLASSIFIER'] = os.getenv('PERSONAL_COLOR_CLASSIFIER', 'sklearn')
+
+# CPU 스레드 예산 (runtime.py): 코어 수를 서버 워커 프로세스 수(WEB_CONCURRENCY, gunicorn과 같은 변수)와
+# 프로세스 안의 동시 torch 추론 수, 동시 전처리 수(ANALYSIS_WORKERS)로 나눠 torch/OpenCV/BLAS 스레드 수를 정함
+app.config['SERVER_WORKERS'] = int(os.getenv('WEB_CONCURRENCY', '1'))
+app.config['INFERENCE_CONCURRENCY'] = int(os.getenv('INFERENCE_CONCURRENCY', '2'))
+app.config['THREAD_BUDGET_CPUS'] = int(os.getenv('THREAD_BUDGET_CPUS', '0'))  # 0이면 자동 감지
+
+# /metrics 스크레이프용 Bearer 토큰 (비어 있으면 관리자 세션으로만 조회 가능)
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN', '')
+
+# 모델은 백그라운드에서 동시에 로드되며, 요청은 자기 모델이 로드 중이면 최대 이 시간(초)만큼 기다린 뒤 503
+app.config['MODEL_WAIT_SECONDS'] = float(os.getenv('MODEL_WAIT_SECONDS', '30'))
+
 # AI 모델 관련 전역 변수
 MODEL_DIR = '.'
 N_REPRESENTATIVE_COLORS = 7
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
+# 모델 로드 전에 라이브러리별 스레드 풀 크기를 맞춤 (동시 요청의 코어 과다 구독 방지)
+runtime_settings = apply_thread_budget(thread_budget(
+    app.config['THREAD_BUDGET_CPUS'] or available_cpus(),
+    workers=app.config['SERVER_WORKERS'],
+    inference_concurrency=app.config['INFERENCE_CONCURRENCY'],
+    request_concurrency=app.config['ANALYSIS_WORKERS']))
+print(f"✓ Thread budget: {format_runtime_info(runtime_settings)}")
+
 # 퍼스널 컬러 타입별 정보 데이터
 CLUSTER_DESCRIPTIONS = {
     0: {
@@ -159,10 +245,28 @@ MAKEOVER_PALETTES = {
 # AI 모델 관련 전역 변수 초기화
 kmeans_model = None
 scaler = None
+classifier = None  # scaler + kmeans_model을 접은 근사 NumPy 분류기 (PERSONAL_COLOR_CLASSIFIER=fast)
 face_detector = None
 face_parser = None
 face_parsing_net = None # 가상 메이크업용 모델
-models_loaded = False
+bisenet_backend = None  # 실제로 로드된 BiSeNet 백엔드 (내보낸 모델이 없으면 BISENET_BACKEND 대신 'eager')
+
+# 분석(/analyze, /analyze_jobs)에 필요한 모델 (가상 메이크업은 parsing_models() 참고)
+ANALYSIS_MODELS = ('classifier', 'face_detector', 'face_parser')
+
+# 단계별 지연 시간 및 대기열 지표
+metrics = MetricsRegistry()
+
+# 비동기 분석 작업 관리자
+analysis_jobs = JobManager(ANALYSIS_STAGES,
+                           max_workers=app.config['ANALYSIS_WORKERS'],
+                           max_pending=app.config['ANALYSIS_MAX_PENDING'],
+                           ttl_seconds=app.config['ANALYSIS_JOB_TTL'])
+metrics.register_queue('analysis_jobs', analysis_jobs.pending_count)
+
+# 가상 메이크업용 파싱 마스크 캐시
+parsing_cache = ParsingCache(app.config['PARSING_CACHE_FOLDER'], max_bytes=app.config['PARSING_CACHE_BYTES'],
+                             max_disk_bytes=app.config['PARSING_CACHE_DISK_BYTES'])
 
 # 이미지 텐서 변환 (가상 메이크업용)
 to_tensor = transforms.Compose([
@@ -182,201 +286,313 @@ def hex_to_bgr(hex_color):
 # ==============================================================================
 from pdf import generate_report_pdf
 
+# 고급 조명 보정 함수들
+from lighting import prepare_analysis_image
 
 
-# ==============================================================================
-# 고급 조명 보정 함수들 (기존과 동일)
-# ==============================================================================
-def analyze_lighting_conditions(image_np):
-    """이미지의 조명 상태를 분석하여 보정 전략을 결정"""
-    lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)
-    l_channel = lab[:, :, 0]
-    mean_brightness = np.mean(l_channel)
-    std_brightness = np.std(l_channel)
-    dark_pixels = np.sum(l_channel < 85) / l_channel.size
-    bright_pixels = np.sum(l_channel > 170) / l_channel.size
-    return {
-        'mean_brightness': mean_brightness, 'std_brightness': std_brightness,
-        'dark_ratio': dark_pixels, 'bright_ratio': bright_pixels,
-        'is_underexposed': mean_brightness < 120 and dark_pixels > 0.3,
-        'is_overexposed': mean_brightness > 180 and bright_pixels > 0.2,
-        'has_low_contrast': std_brightness < 25, 'has_uneven_lighting': std_brightness > 50
-    }
-
-def white_balance_correction(image_np, method='gray_world'):
-    """화이트 밸런스 보정"""
-    image = image_np.astype(np.float32) / 255.0
-    if method == 'gray_world':
-        mean_rgb = np.mean(image.reshape(-1, 3), axis=0)
-        scale_factors = 0.5 / (mean_rgb + 1e-8)
-        corrected = image * scale_factors
-    elif method == 'white_patch':
-        max_rgb = np.max(image.reshape(-1, 3), axis=0)
-        scale_factors = 1.0 / (max_rgb + 1e-8)
-        corrected = image * scale_factors
-    else: # illuminant_estimation
-        h, w = image.shape[:2]
-        block_means = [np.mean(image[i:i+h//3, j:j+w//3].reshape(-1, 3), axis=0) for i in range(0, h, h//3) for j in range(0, w, w//3) if image[i:i+h//3, j:j+w//3].size > 0]
-        if block_means:
-            illuminant = np.array(block_means)[np.argmax(np.sum(block_means, axis=1))]
-            scale_factors = 0.9 / (illuminant + 1e-8)
-            corrected = image * scale_factors
-        else:
-            corrected = image
-    return (np.clip(corrected, 0, 1) * 255).astype(np.uint8)
-
-def adaptive_histogram_equalization(image_np, clip_limit=3.0, tile_grid_size=(8, 8)):
-    """적응적 히스토그램 평활화 (CLAHE)"""
-    lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)
-    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
-    lab[:, :, 0] = clahe.apply(lab[:, :, 0])
-    return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
-
-def gamma_correction(image_np, gamma=1.0):
-    """감마 보정"""
-    inv_gamma = 1.0 / gamma
-    table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in np.arange(0, 256)]).astype("uint8")
-    return cv2.LUT(image_np, table)
-
-def shadow_highlight_correction(image_np, shadow_amount=0.0, highlight_amount=0.0, shadow_width=50, highlight_width=50):
-    """그림자/하이라이트 보정"""
-    lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB).astype(np.float32)
-    l_channel = lab[:, :, 0] / 255.0
-    shadow_mask = np.exp(-((l_channel - 0.0) ** 2) / (2 * (shadow_width / 255.0) ** 2))
-    highlight_mask = np.exp(-((l_channel - 1.0) ** 2) / (2 * (highlight_width / 255.0) ** 2))
-    if shadow_amount != 0.0:
-        l_channel += shadow_amount * shadow_mask * (1.0 - l_channel)
-    if highlight_amount != 0.0:
-        l_channel += highlight_amount * highlight_mask * (l_channel - 1.0)
-    lab[:, :, 0] = np.clip(l_channel, 0, 1) * 255.0
-    return cv2.cvtColor(lab.astype(np.uint8), cv2.COLOR_LAB2RGB)
-
-def unsharp_masking(image_np, strength=0.5, radius=1.0, threshold=0.0):
-    """언샤프 마스킹을 통한 선명도 향상"""
-    blurred = cv2.GaussianBlur(image_np, (0, 0), radius)
-    mask = image_np.astype(np.float32) - blurred.astype(np.float32)
-    if threshold > 0:
-        mask = np.where(np.abs(mask) < threshold, 0, mask)
-    sharpened = np.clip(image_np.astype(np.float32) + strength * mask, 0, 255).astype(np.uint8)
-    return sharpened
-
-def comprehensive_lighting_correction(image_np, lighting_info=None):
-    """종합적인 조명 보정 파이프라인"""
-    if lighting_info is None:
-        lighting_info = analyze_lighting_conditions(image_np)
-    
-    corrected = image_np.copy()
-    correction_log = []
-    
-    wb_method = 'gray_world'
-    if lighting_info['bright_ratio'] > 0.15: wb_method = 'white_patch'
-    elif lighting_info['has_uneven_lighting']: wb_method = 'illuminant_estimation'
-    corrected = white_balance_correction(corrected, method=wb_method)
-    correction_log.append(f"White balance: {wb_method}")
-    
-    if lighting_info['is_underexposed']:
-        corrected = shadow_highlight_correction(corrected, shadow_amount=0.3, highlight_amount=-0.1)
-        corrected = gamma_correction(corrected, 0.7)
-        correction_log.append("Underexposure correction: shadow lift + gamma 0.7")
-    elif lighting_info['is_overexposed']:
-        corrected = shadow_highlight_correction(corrected, shadow_amount=0.0, highlight_amount=-0.4)
-        corrected = gamma_correction(corrected, 1.3)
-        correction_log.append("Overexposure correction: highlight recovery + gamma 1.3")
-    
-    if lighting_info['has_low_contrast']:
-        clip_limit = 4.0 if lighting_info['std_brightness'] < 15 else 2.5
-        corrected = adaptive_histogram_equalization(corrected, clip_limit=clip_limit)
-        correction_log.append(f"Low contrast correction: CLAHE (clip_limit={clip_limit})")
-    elif lighting_info['has_uneven_lighting']:
-        corrected = adaptive_histogram_equalization(corrected, clip_limit=2.0, tile_grid_size=(6, 6))
-        correction_log.append("Uneven lighting correction: Soft CLAHE")
-    
-    if lighting_info['std_brightness'] < 30:
-        corrected = unsharp_masking(corrected, strength=0.3, radius=1.2)
-        correction_log.append("Sharpening applied")
-        
-    return corrected, correction_log
 
 # ==============================================================================
 # 모델 로드 및 주요 함수
 # ==============================================================================
 
-def load_models():
-    """AI 모델과 스케일러를 로드하는 함수"""
-    global kmeans_model, scaler, face_detector, face_parser, models_loaded, face_parsing_net
-    
+def load_classifier():
+    """퍼스널 컬러 진단 모델 (KMeans + 스케일러)"""
+    global kmeans_model, scaler, classifier
+    kmeans_model = joblib.load(os.path.join(MODEL_DIR, 'kmeans_model.joblib'))
+    scaler = joblib.load(os.path.join(MODEL_DIR, 'scaler.joblib'))
+    classifier = PersonalColorClassifier.from_sklearn(scaler, kmeans_model)
+    print("✓ K-means model and scaler loaded successfully.")
+
+def load_face_detector():
+    """Facer 얼굴 검출 모델"""
+    global face_detector
+    face_detector = facer.face_detector('retinaface/mobilenet', device=device)
+    print("✓ Facer face detector loaded successfully.")
+
+def load_face_parser():
+    """Facer FaRL 얼굴 파싱 모델"""
+    global face_parser
+    face_parser = facer.face_parser('farl/celebm/448', device=device)
+    print("✓ Facer face parser loaded successfully.")
+
+def load_face_parsing_net():
+    """가상 메이크업용 BiSeNet (79999_iter.pth 파일이 'res/cp/' 폴더 안에 있어야 합니다)"""
+    global face_parsing_net, bisenet_backend
+    # (ImageNet 사전학습 가중치 다운로드 및 랜덤 초기화 없이 바로 로드)
+    backend = app.config['BISENET_BACKEND']
     try:
-        print("Loading AI models...")
-        
-        # 퍼스널 컬러 진단 모델
-        kmeans_model = joblib.load(os.path.join(MODEL_DIR, 'kmeans_model.joblib'))
-        scaler = joblib.load(os.path.join(MODEL_DIR, 'scaler.joblib'))
-        print("✓ K-means model and scaler loaded successfully.")
-
-        # Facer 라이브러리의 얼굴 관련 모델들
-        face_detector = facer.face_detector('retinaface/mobilenet', device=device)
-        face_parser = facer.face_parser('farl/celebm/448', device=device)
-        print("✓ Facer models loaded successfully.")
-        
-        # 가상 메이크업용 모델 로드 추가
-        face_parsing_net = BiSeNet(n_classes=19)
-        # 79999_iter.pth 파일이 'res/cp/' 폴더 안에 있어야 합니다.
-        face_parsing_net.load_state_dict(torch.load('res/cp/79999_iter.pth', map_location='cpu'))
-        face_parsing_net.eval()
-        print("✓ Face Parsing model for makeover loaded successfully.")
-        
-        print(f"✓ Using device: {device}")
-        models_loaded = True
-    except FileNotFoundError as e:
-        print(f"❌ ERROR: Model file not found. {e}")
-    except Exception as e:
-        print(f"❌ An unexpected error occurred during model loading: {e}")
-        traceback.print_exc()
+        face_parsing_net = load_bisenet('res/cp/79999_iter.pth', backend=backend, n_classes=19,
+                                        num_threads=torch.get_num_threads())
+    except (FileNotFoundError, ImportError) as e:
+        if backend == 'eager':
+            raise
+        # 내보낸 모델이나 onnxruntime이 없으면 eager PyTorch로 실행
+        print(f"⚠️ BiSeNet backend '{backend}' unavailable ({e}); falling back to eager.")
+        backend = 'eager'
+        face_parsing_net = load_inference_model('res/cp/79999_iter.pth', n_classes=19)
+    bisenet_backend = backend
+    print(f"✓ Face Parsing model for makeover loaded successfully ({backend}).")
+
+# 모델별 백그라운드 로더와 준비 상태 (/ready)
+model_registry = ModelRegistry()
+model_registry.register('classifier', load_classifier)
+model_registry.register('face_detector', load_face_detector)
+model_registry.register('face_parser', load_face_parser)
+model_registry.register('bisenet', load_face_parsing_net)
+
+def load_models(wait=False):
+    """
+    AI 모델들을 모델마다 백그라운드 스레드에서 동시에 로드 시작.
+    wait=True면 모든 로드가 끝날 때까지 기다리고 전부 성공했는지 반환합니다 (gunicorn preload 포크 전).
+    """
+    print(f"Loading AI models in background... (device: {device})")
+    model_registry.start()
+    if not wait:
+        return None
+    loaded = model_registry.join()
+    timings = ', '.join(f"{name} {model['state']} ({model['seconds']:.1f} s)"
+                        for name, model in model_registry.status().items())
+    print(f"{'✓' if loaded else '❌'} Models: {timings}")
+    return loaded
+
+def parsing_models(cache_key=None):
+    """
+    가상 메이크업 파싱에 필요한 모델 (PARSE_REGION=face면 얼굴 검출 모델 포함).
+    cache_key의 /analyze 분할 결과가 저장되어 있으면 저해상도 BiSeNet 파싱만 필요합니다.
+    """
+    if cache_key is not None and app.config['REUSE_ANALYSIS_PARSING'] and \
+            parsing_cache.has_compact(analysis_parsing_key(cache_key)):
+        return ('bisenet',)
+    if app.config['PARSE_REGION'] == 'face':
+        return ('bisenet', 'face_detector')
+    return ('bisenet',)
+
+def wait_for_models(names):
+    """names 모델이 준비될 때까지 최대 MODEL_WAIT_SECONDS 기다리고 사용 가능한지 반환"""
+    return model_registry.wait(names, timeout=app.config['MODEL_WAIT_SECONDS'])
 
 def allowed_file(filename):
     """업로드된 파일이 허용된 확장자인지 확인하는 함수"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def extract_facial_part_colors(image: Image.Image, n_colors_per_part=7, apply_lighting_correction=True, is_camera_input=False):
-    """얼굴에서 피부 색상 특징(Lab 색공간)을 추출하는 핵심 함수 (조명 보정 포함)"""
+def analyze_face_batch(items):
+    """
+    (448x448 이미지 텐서, 진행 콜백) 목록을 한 번에 검출·파싱하여
+    이미지별 분할 맵(얼굴이 없으면 None)을 반환
+    """
+    images = torch.stack([img_tensor for img_tensor, _ in items]).to(device)
+    results = [None] * len(items)
+
+    with torch.inference_mode():
+        with metrics.timed('detect', endpoint='facer-batcher'), metrics.in_flight('facer_detector'):
+            faces = face_detector(images)
+        if len(faces['scores']) == 0:
+            return results
+
+        # 이미지마다 가장 먼저 검출된(점수가 가장 높은) 얼굴만 파싱
+        first_faces = {}
+        for i, image_id in enumerate(faces['image_ids'].tolist()):
+            first_faces.setdefault(image_id, i)
+        keep = [i for i in first_faces.values() if faces['scores'][i] >= 0.5]
+        if not keep:
+            return results
+        keep = torch.tensor(keep, device=faces['scores'].device)
+        faces = {k: faces[k][keep] for k in ('rects', 'points', 'scores', 'image_ids')}
+        for image_id in faces['image_ids'].tolist():
+            _, progress = items[image_id]
+            if progress:
+                progress('parse')
+        with metrics.timed('parse', endpoint='facer-batcher'), metrics.in_flight('facer_parser'):
+            faces = face_parser(images, faces)
+
+    seg_maps = faces['seg']['logits'].argmax(dim=1).cpu().numpy()
+    for image_id, seg_map in zip(faces['image_ids'].tolist(), seg_maps):
+        results[image_id] = seg_map
+    return results
+
+# /analyze 용 facer 검출·파싱 마이크로 배치 스케줄러
+face_analysis_batcher = MicroBatcher(analyze_face_batch,
+                                     max_batch_size=app.config['ANALYZE_BATCH_SIZE'],
+                                     max_wait_ms=app.config['ANALYZE_BATCH_WAIT_MS'],
+                                     name='facer-batcher')
+metrics.register_queue('facer', face_analysis_batcher.qsize)
+
+def extract_facial_part_colors(image: Image.Image, n_colors_per_part=7, apply_lighting_correction=True, is_camera_input=False, progress=None, face_info=None):
+    """
+    얼굴에서 피부 색상 특징(Lab 색공간)을 추출하는 핵심 함수 (조명 보정 포함)
+    progress(stage)가 주어지면 각 단계 시작 시 호출합니다.
+    face_info(dict)가 주어지면 분석 크기의 FaRL 분할 맵('seg')을 채웁니다.
+    """
+    progress = progress or (lambda stage: None)
     try:
-        image_np = np.array(image)
-        
-        # 카메라 입력의 경우 노이즈 감소를 위해 양방향 필터 적용
-        if is_camera_input:
-            image_np = cv2.bilateralFilter(image_np, d=9, sigmaColor=75, sigmaSpace=75)
-
-        correction_log = []
-        if apply_lighting_correction:
-            image_np, correction_log = comprehensive_lighting_correction(image_np)
-            image = Image.fromarray(image_np)
-        
-        image_resized = image.resize((448, 448))
-        image_tensor = torch.from_numpy(np.array(image_resized)).permute(2, 0, 1).unsqueeze(0).to(device)
-
-        with torch.inference_mode():
-            faces = face_detector(image_tensor)
-            if len(faces['scores']) == 0 or faces['scores'][0] < 0.5:
-                return None, "얼굴을 감지할 수 없습니다.", []
-            faces = face_parser(image_tensor, faces)
-
-        seg_map = faces['seg']['logits'].argmax(dim=1).squeeze(0).cpu().numpy()
-        image_lab = cv2.cvtColor(np.array(image_resized), cv2.COLOR_RGB2Lab)
+        progress('correct')
+        image_np, correction_log = prepare_analysis_image(
+            image,
+            apply_correction=apply_lighting_correction,
+            is_camera_input=is_camera_input,
+            resolution=app.config['LIGHTING_RESOLUTION'],
+            pipeline=app.config['LIGHTING_PIPELINE'],
+            timer=metrics.timed
+        )
+        image_tensor = torch.from_numpy(image_np).permute(2, 0, 1)
+
+        # 동시 요청과 함께 배치로 얼굴 검출 및 파싱
+        progress('detect')
+        with metrics.timed('face_analysis'):
+            seg_map = face_analysis_batcher((image_tensor, progress))
+        if seg_map is None:
+            return None, "얼굴을 감지할 수 없습니다.", []
+        if face_info is not None:
+            face_info.update(seg=seg_map)
+
+        image_lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2Lab)
         skin_pixels = image_lab[np.isin(seg_map, [1, 2])]
 
         if len(skin_pixels) < n_colors_per_part:
             return None, "피부 영역이 충분하지 않습니다.", correction_log
 
-        kmeans = KMeans(n_clusters=n_colors_per_part, n_init='auto', random_state=42)
-        kmeans.fit(skin_pixels.astype(np.float32))
+        progress('cluster')
+        with metrics.timed('kmeans'):
+            centers = skin_color_centers(skin_pixels, n_colors_per_part, method=app.config['SKIN_QUANTIZER'])
         
-        return kmeans.cluster_centers_.astype(np.float32).flatten().reshape(1, -1), None, correction_log
+        return centers.flatten().reshape(1, -1), None, correction_log
 
     except Exception as e:
         traceback.print_exc()
         return None, f"이미지 분석 중 오류가 발생했습니다: {str(e)}", []
 
+def read_upload(filepath):
+    """업로드 이미지를 BGR로 읽고, 파일 내용 해시(캐시 키)와 함께 반환하는 함수"""
+    if not os.path.isfile(filepath):
+        return None, None
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    img_bgr = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    return img_bgr, content_hash(data)
+
+def parse_face_batch(img_tensors):
+    """
+    이미지 텐서 목록을 BiSeNet으로 파싱해 라벨 맵 목록을 반환.
+    같은 크기(512x512, 얼굴 영역 모드의 저해상도 전체 사진 등)끼리 한 번의 추론으로 묶습니다.
+    """
+    results = [None] * len(img_tensors)
+    groups = {}
+    for i, img_tensor in enumerate(img_tensors):
+        groups.setdefault(tuple(img_tensor.shape), []).append(i)
+    with torch.inference_mode():
+        for indices in groups.values():
+            with metrics.timed('bisenet_forward', endpoint='bisenet-batcher'), metrics.in_flight('bisenet'):
+                labels = face_parsing_net.parse(torch.stack([img_tensors[i] for i in indices])).cpu().numpy()
+            for i, label in zip(indices, labels):
+                results[i] = label
+    return results
+
+# 가상 메이크업용 BiSeNet 마이크로 배치 스케줄러
+parse_batcher = MicroBatcher(parse_face_batch,
+                             max_batch_size=app.config['PARSE_BATCH_SIZE'],
+                             max_wait_ms=app.config['PARSE_BATCH_WAIT_MS'],
+                             name='bisenet-batcher')
+metrics.register_queue('bisenet', parse_batcher.qsize)
+
+def detect_face_rect(img_rgb):
+    """사진에서 점수가 가장 높은 얼굴 상자 (x1, y1, x2, y2)를 원본 좌표로 반환 (없으면 None)"""
+    h, w = img_rgb.shape[:2]
+    scale = min(1.0, app.config['PARSE_DETECT_MAX_SIDE'] / max(h, w))
+    if scale < 1.0:
+        img_rgb = cv2.resize(img_rgb, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+    image = torch.from_numpy(img_rgb).permute(2, 0, 1).unsqueeze(0).to(device)
+    with torch.inference_mode():
+        with metrics.timed('detect'), metrics.in_flight('facer_detector'):
+            faces = face_detector(image)
+    if len(faces['scores']) == 0:
+        return None
+    best = int(torch.argmax(faces['scores']))
+    if faces['scores'][best] < 0.5:
+        return None
+    return faces['rects'][best].cpu().numpy() / scale
+
+def parse_face_region(img_rgb):
+    """
+    얼굴 주변 정사각형을 512x512로, 사진 전체를 PARSE_COARSE_SIZE로 파싱해 합친 라벨 맵을 반환.
+    라벨 맵은 얼굴 영역이 512x512가 되는 크기(원본 이하)로 합칩니다.
+    얼굴이 없거나 얼굴 영역이 사진 대부분을 차지하면 None (전체 파싱 사용)
+    """
+    shape = img_rgb.shape[:2]
+    rect = detect_face_rect(img_rgb)
+    if rect is None:
+        return None
+    box = face_crop_box(rect, shape)
+    if crop_area_ratio(box, shape) >= FACE_CROP_MAX_AREA:
+        return None
+
+    left, top, right, bottom = box
+    coarse_size = app.config['PARSE_COARSE_SIZE']
+    crop = Image.fromarray(np.ascontiguousarray(img_rgb[top:bottom, left:right])).resize((512, 512))
+    whole = Image.fromarray(img_rgb).resize((coarse_size, coarse_size))
+    with metrics.timed('bisenet'):
+        fine = parse_batcher.submit(to_tensor(crop))
+        coarse = parse_batcher.submit(to_tensor(whole))
+        fine = fine.result(timeout=parse_batcher.result_timeout)
+        coarse = coarse.result(timeout=parse_batcher.result_timeout)
+    compact_shape, compact_face_box = compact_box(box, shape)
+    return compose_parsing(coarse, fine, compact_face_box, compact_shape)
+
+def parsing_key(cache_key):
+    """
+    업로드 내용 해시에 파싱 설정(PARSE_REGION, BiSeNet 백엔드)을 더한 파싱 캐시 키.
+    백엔드는 실제로 로드된 것을 쓰므로 eager로 대신 실행한 결과가 다른 백엔드 키로 저장되지 않습니다
+    (로드 전에는 설정값 BISENET_BACKEND).
+    """
+    return f"{cache_key}.{app.config['PARSE_REGION']}.{bisenet_backend or app.config['BISENET_BACKEND']}"
+
+def get_cached_parsing(img_bgr, cache_key):
+    """캐시된 원본 크기 얼굴 파싱 마스크를 반환 (없으면 None)"""
+    return parsing_cache.get(parsing_key(cache_key), img_bgr.shape[:2])
+
+def get_parsing_map(img_bgr, cache_key):
+    """원본 크기의 얼굴 파싱 마스크를 반환 (캐시에 있으면 BiSeNet 추론 생략, /analyze 분할 결과가 있으면 저해상도 파싱만)"""
+    shape = img_bgr.shape[:2]
+    parsing_resized = get_cached_parsing(img_bgr, cache_key)
+    if parsing_resized is not None:
+        return parsing_resized
+    key = parsing_key(cache_key)
+
+    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    if app.config['REUSE_ANALYSIS_PARSING']:
+        face_parsing = parsing_cache.get_compact(analysis_parsing_key(cache_key))
+        if face_parsing is not None:
+            return parsing_cache.put(key, merge_analysis_parsing(img_rgb, face_parsing), shape)
+
+    if app.config['PARSE_REGION'] == 'face':
+        parsing = parse_face_region(img_rgb)
+        if parsing is not None:
+            return parsing_cache.put(key, parsing, shape)
+
+    img_pil_resized = Image.fromarray(img_rgb).resize((512, 512))
+    with metrics.timed('bisenet'):
+        parsing = parse_batcher(to_tensor(img_pil_resized))
+    return parsing_cache.put(key, parsing, shape)
+
+def analysis_parsing_key(cache_key):
+    """/analyze의 FaRL 분할 결과를 저장하는 파싱 캐시 키"""
+    return f"{cache_key}.farl"
+
+def store_analysis_parsing(cache_key, face_info):
+    """/analyze의 FaRL 분할 맵을 BiSeNet 파트 번호로 바꿔 분석 크기(448x448) 그대로 디스크 캐시에 저장"""
+    parsing_cache.put_compact(analysis_parsing_key(cache_key), farl_to_bisenet(face_info['seg']))
+
+def merge_analysis_parsing(img_rgb, face_parsing):
+    """
+    /analyze의 FaRL 라벨 맵(face_parsing)에서 배경인 픽셀(얼굴 주변 밖의 머리카락, 옷 등)을
+    PARSE_COARSE_SIZE 크기의 BiSeNet 전체 사진 파싱으로 채운 분석 크기 라벨 맵을 반환
+    """
+    coarse_size = app.config['PARSE_COARSE_SIZE']
+    whole = Image.fromarray(img_rgb).resize((coarse_size, coarse_size))
+    with metrics.timed('bisenet'):
+        coarse = parse_batcher(to_tensor(whole))
+    return fill_background(face_parsing, coarse)
+
 def get_cluster_info(cluster_id):
     """클러스터 ID에 해당하는 퍼스널 컬러 정보를 반환하는 함수"""
     return CLUSTER_DESCRIPTIONS.get(cluster_id, CLUSTER_DESCRIPTIONS[0])
@@ -385,68 +601,260 @@ def get_cluster_info(cluster_id):
 # 웹 라우트 정의
 # ==============================================================================
 
+@app.before_request
+def bind_metrics_endpoint():
+    """요청마다 단계별 지표의 endpoint 라벨을 현재 라우트로 설정"""
+    set_endpoint(request.endpoint or 'unknown')
+
+def is_admin():
+    """현재 세션이 관리자(개발자) 계정인지 확인"""
+    return bool(session.get('user') and session['user'].get('name') == 'hanwae')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    단계별 지연 시간 히스토그램과 대기열/추론 중 게이지를 Prometheus 텍스트 형식으로 제공
+    (관리자 세션 또는 Authorization: Bearer METRICS_TOKEN).
+    지표는 프로세스별로 집계되므로 gunicorn 워커가 여러 개면 스크레이프마다 요청을 받은 워커 하나의 값입니다.
+    """
+    token = app.config['METRICS_TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    if not (is_admin() or (token and hmac.compare_digest(authorization, f'Bearer {token}'))):
+        return jsonify({'success': False, 'error': 'Not authorized'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ready')
+def readiness():
+    """
+    모델별 로드 상태와 로드 시간, 기능별 사용 가능 여부 (오케스트레이션 준비 상태 확인용).
+    ?models=classifier,bisenet 처럼 지정한 모델(없으면 전체)이 모두 준비되면 200, 아니면 503
+    """
+    names = request.args.get('models')
+    names = None if names is None else [name for name in names.split(',') if name]
+    unknown = [name for name in names or () if name not in model_registry.status()]
+    if unknown:
+        return jsonify({'ready': False, 'error': f"Unknown models: {', '.join(unknown)}"}), 400
+
+    ready = model_registry.ready(names)
+    return jsonify({
+        'ready': ready,
+        'models': model_registry.status(),
+        'bisenet_backend': bisenet_backend,
+        'features': {'analysis': model_registry.ready(ANALYSIS_MODELS),
+                     'makeover': model_registry.ready(parsing_models())},
+    }), 200 if ready else 503
+
+@app.route('/admin/runtime')
+def admin_runtime():
+    """CPU 스레드 예산과 라이브러리별 실제 스레드 수 (관리자 전용)"""
+    if not is_admin():
+        return jsonify({'success': False, 'error': 'Not authorized'}), 403
+    return jsonify(runtime_info())
+
 @app.route('/')
 def index():
     """메인 페이지를 렌더링하는 라우트"""
     page = request.args.get('page', 'home')
     return render_template('index.html', user=session.get('user'), initial_page=page)
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    """이미지 분석을 수행하는 메인 API 엔드포인트"""
-    if 'user' not in session:
-        return jsonify({'error': '로그인이 필요한 서비스입니다.'}), 401
+def read_analysis_request():
+    """
+    분석 요청에서 이미지 바이트와 옵션을 꺼내는 함수.
+    (image_bytes, is_camera_input, apply_correction, None) 또는 오류 시 (None, None, None, (응답, 상태코드))를 반환
+    """
+    apply_correction = request.form.get('apply_lighting_correction', 'true').lower() == 'true'
 
-    if not models_loaded:
-        return jsonify({'error': 'AI 모델이 로드되지 않았습니다.'}), 503
+    if 'file' in request.files:
+        file = request.files['file']
+        if file.filename == '' or not allowed_file(file.filename):
+            return None, None, None, ({'error': '잘못된 파일입니다.'}, 400)
+        return file.read(), False, apply_correction, None
+
+    data = request.get_json(silent=True)
+    if data and 'image_data' in data:
+        image_bytes = base64.b64decode(data['image_data'].split(',')[1])
+        return image_bytes, True, data.get('apply_lighting_correction', True), None
+
+    return None, None, None, ({'error': '이미지 파일 또는 데이터가 필요합니다.'}, 400)
 
+def run_analysis(image_bytes, is_camera_input=False, apply_correction=True, progress=None):
+    """이미지 디코딩부터 퍼스널 컬러 예측, 업로드 저장까지 수행하고 (응답 데이터, 상태코드)를 반환"""
+    progress = progress or (lambda stage: None)
     try:
-        image = None
-        is_camera_input = False
-        filename = f"upload_{np.datetime64('now').astype(int)}.jpg"
-        apply_correction = request.form.get('apply_lighting_correction', 'true').lower() == 'true'
-        
-        if 'file' in request.files:
-            file = request.files['file']
-            if file.filename == '' or not allowed_file(file.filename):
-                return jsonify({'error': '잘못된 파일입니다.'}), 400
-            image = Image.open(file.stream).convert('RGB')
-        elif request.json and 'image_data' in request.json:
-            is_camera_input = True
-            image_data = request.json['image_data'].split(',')[1]
-            image = Image.open(BytesIO(base64.b64decode(image_data))).convert('RGB')
-            apply_correction = request.json.get('apply_lighting_correction', True)
-        else:
-            return jsonify({'error': '이미지 파일 또는 데이터가 필요합니다.'}), 400
+        progress('decode')
+        # 동시 분석 요청(작업 워커, 배치)끼리 파일이 겹치지 않도록 요청마다 고유한 이름 사용
+        filename = f"upload_{uuid.uuid4().hex}.jpg"
+        with metrics.timed('decode'):
+            image = Image.open(BytesIO(image_bytes)).convert('RGB')
 
+        face_info = {}
         lab_features, error_msg, correction_log = extract_facial_part_colors(
             image,
             n_colors_per_part=N_REPRESENTATIVE_COLORS,
             apply_lighting_correction=apply_correction,
-            is_camera_input=is_camera_input
+            is_camera_input=is_camera_input,
+            progress=progress,
+            face_info=face_info
         )
         
         if error_msg:
-            return jsonify({'error': error_msg}), 400
-
-        scaled_features = scaler.transform(lab_features)
-        predicted_cluster = kmeans_model.predict(scaled_features)[0]
+            return {'error': error_msg}, 400
+
+        progress('classify')
+        with metrics.timed('classify'):
+            if app.config['PERSONAL_COLOR_CLASSIFIER'] == 'fast':
+                predicted_cluster = classifier.predict(lab_features)[0]
+            else:
+                scaled_features = scaler.transform(lab_features)
+                predicted_cluster = kmeans_model.predict(scaled_features)[0]
         cluster_info = get_cluster_info(predicted_cluster)
         
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
-        image.save(filepath, 'JPEG')
-
-        return jsonify({
+        with metrics.timed('save'):
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG')
+            data = buffer.getvalue()
+            with open(filepath, 'wb') as f:
+                f.write(data)
+
+        # 저장된 업로드의 내용 해시로 분할 결과를 캐시해 가상 메이크업에서 재사용
+        if app.config['REUSE_ANALYSIS_PARSING'] and face_info:
+            with metrics.timed('store_parsing'):
+                store_analysis_parsing(content_hash(data), face_info)
+
+        return {
             "success": True, "cluster_id": int(predicted_cluster),
             "personal_color_type": cluster_info["name"], "visual_name": cluster_info["visual_name"],
             "type_description": cluster_info["description"], "palette": cluster_info["palette"],
             "uploaded_image_url": f'/uploads/{filename}', "lighting_correction_applied": apply_correction,
             "correction_log": correction_log
-        })
+        }, 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return {'error': f'분석 중 오류가 발생했습니다: {str(e)}'}, 500
 
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    """이미지 분석을 수행하는 메인 API 엔드포인트"""
+    if 'user' not in session:
+        return jsonify({'error': '로그인이 필요한 서비스입니다.'}), 401
+
+    if not wait_for_models(ANALYSIS_MODELS):
+        return jsonify({'error': 'AI 모델이 로드되지 않았습니다.'}), 503
+
+    try:
+        image_bytes, is_camera_input, apply_correction, error = read_analysis_request()
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': f'분석 중 오류가 발생했습니다: {str(e)}'}), 500
+    if error:
+        return jsonify(error[0]), error[1]
+
+    payload, status_code = run_analysis(image_bytes, is_camera_input, apply_correction)
+    return jsonify(payload), status_code
+
+# ==============================================================================
+# 비동기 분석 작업 API (작업 제출 → 상태 조회 또는 SSE 진행 상황 구독)
+# ==============================================================================
+
+def job_view(job):
+    """작업 스냅샷을 클라이언트 응답 형식으로 변환"""
+    view = {'job_id': job['job_id'], 'status': job['status'], 'stage': job['stage'], 'progress': job['progress']}
+    if job['status'] in ('done', 'failed'):
+        view['status_code'] = job['status_code']
+        view['result'] = job['result']
+    return view
+
+def job_owner():
+    """작업 소유자로 쓰는 현재 세션 사용자의 이메일 (로그인하지 않았거나 이메일이 없으면 None)"""
+    user = session.get('user') or {}
+    return user.get('email') or None
+
+def get_user_job(job_id):
+    """현재 로그인한 사용자의 작업을 반환 (없거나 다른 사용자의 작업이면 None)"""
+    owner = job_owner()
+    job = analysis_jobs.get(job_id)
+    if owner is None or job is None or job['owner'] != owner:
+        return None
+    return job
+
+@app.route('/analyze_jobs', methods=['POST'])
+def submit_analysis_job():
+    """분석 작업을 제출하고 즉시 작업 ID를 반환하는 엔드포인트"""
+    if 'user' not in session:
+        return jsonify({'error': '로그인이 필요한 서비스입니다.'}), 401
+    # 작업 조회 권한을 이메일로 확인하므로 이메일이 없는 세션은 작업을 만들 수 없음
+    owner = job_owner()
+    if owner is None:
+        return jsonify({'error': '사용자 정보(이메일)를 확인할 수 없습니다. 다시 로그인해주세요.'}), 401
+
+    if not wait_for_models(ANALYSIS_MODELS):
+        return jsonify({'error': 'AI 모델이 로드되지 않았습니다.'}), 503
+
+    try:
+        image_bytes, is_camera_input, apply_correction, error = read_analysis_request()
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': f'분석 중 오류가 발생했습니다: {str(e)}'}), 500
+    if error:
+        return jsonify(error[0]), error[1]
+
+    try:
+        job_id = analysis_jobs.submit(run_analysis, image_bytes, is_camera_input, apply_correction,
+                                      owner=owner)
+    except JobQueueFull:
+        return jsonify({'error': '분석 요청이 많아 잠시 후 다시 시도해주세요.'}), 503
+
+    return jsonify({
+        'success': True, 'job_id': job_id,
+        'status_url': f'/analyze_jobs/{job_id}', 'events_url': f'/analyze_jobs/{job_id}/events'
+    }), 202
+
+@app.route('/analyze_jobs/<job_id>')
+def analysis_job_status(job_id):
+    """분석 작업의 현재 상태를 반환 (폴링용)"""
+    if 'user' not in session:
+        return jsonify({'error': '로그인이 필요한 서비스입니다.'}), 401
+
+    job = get_user_job(job_id)
+    if job is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(job_view(job))
+
+@app.route('/analyze_jobs/<job_id>/events')
+def analysis_job_events(job_id):
+    """분석 작업의 단계별 진행 상황을 server-sent events로 전송"""
+    if 'user' not in session:
+        return jsonify({'error': '로그인이 필요한 서비스입니다.'}), 401
+
+    job = get_user_job(job_id)
+    if job is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+
+    deadline = time.monotonic() + app.config['ANALYSIS_EVENTS_MAX_SECONDS']
+
+    def wait_for_update(version):
+        # 최대 유지 시간이 지나면 None (스트림 종료 후 클라이언트가 폴링으로 전환)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return analysis_jobs.wait_for_update(job_id, version, timeout=min(15.0, remaining))
+
+    def stream(job):
+        while job is not None:
+            yield f"data: {json.dumps(job_view(job), ensure_ascii=False)}\n\n"
+            if job['status'] in ('done', 'failed'):
+                return
+            version = job['version']
+            job = wait_for_update(version)
+            # 변경 없이 시간이 지나면 연결 유지를 위한 주석 전송
+            while job is not None and job['version'] == version:
+                yield ": keep-alive\n\n"
+                job = wait_for_update(version)
+
+    return Response(stream_with_context(stream(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/makeover')
 def makeover():
@@ -461,21 +869,17 @@ def makeover():
     personal_color_info = get_cluster_info(cluster_num)
 
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    img_bgr = cv2.imread(filepath)
+    with metrics.timed('decode'):
+        img_bgr, cache_key = read_upload(filepath)
     if img_bgr is None:
         return "오류: 원본 이미지 파일을 찾을 수 없습니다.", 404
-        
-    img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
+    # 캐시된 파싱이 있으면 모델 로드를 기다리지 않음
+    if get_cached_parsing(img_bgr, cache_key) is None and not wait_for_models(parsing_models(cache_key)):
+        return "오류: AI 모델이 로드되지 않았습니다.", 503
 
-    # 얼굴 영역 파싱
-    img_pil_resized = Image.fromarray(img_rgb).resize((512, 512))
-    img_tensor = to_tensor(img_pil_resized).unsqueeze(0)
-    with torch.no_grad():
-        out = face_parsing_net(img_tensor)[0]
-    parsing = out.squeeze(0).cpu().numpy().argmax(0)
-    
-    # 원본 이미지 크기에 맞게 파싱 마스크 리사이즈
-    parsing_resized = np.array(Image.fromarray(parsing.astype(np.uint8)).resize((img_rgb.shape[1], img_rgb.shape[0]), Image.NEAREST))
+    # 얼굴 영역 파싱 (원본 이미지 크기로 리사이즈된 마스크, 캐시 재사용)
+    with metrics.timed('parsing'):
+        parsing_resized = get_parsing_map(img_bgr, cache_key)
     
     # 선택된 팔레트
     selected_palette = MAKEOVER_PALETTES.get(cluster_num)[palette_num]
@@ -495,21 +899,24 @@ def makeover():
         except Exception as e:
             print(f"Error fetching user sex from Firestore: {e}")
 
-    # 메이크업 적용
-    img_makeup = hair(img_bgr, parsing_resized, 17, hair_color) # 헤어
-    img_makeup = hair(img_makeup, parsing_resized, 16, clothes_color)  # 옷
+    # 메이크업 적용 (파트 번호: (색상, 강도))
+    makeup_spec = {
+        17: (hair_color, DEFAULT_INTENSITY),     # 헤어
+        16: (clothes_color, DEFAULT_INTENSITY),  # 옷
+        4: (lens_color, DEFAULT_INTENSITY),      # 왼쪽 눈 (렌즈)
+        5: (lens_color, DEFAULT_INTENSITY),      # 오른쪽 눈 (렌즈)
+    }
     if user_sex != 'male':
-        img_makeup = hair(img_makeup, parsing_resized, 12, lip_color)    # 윗입술
-        img_makeup = hair(img_makeup, parsing_resized, 13, lip_color)    # 아랫입술
-    
-    # 렌즈는 hair 함수를 재사용하되, 다른 파트 번호와 색상을 전달
-    img_makeup = hair(img_makeup, parsing_resized, 4, lens_color)    # 왼쪽 눈
-    img_makeup = hair(img_makeup, parsing_resized, 5, lens_color)    # 오른쪽 눈
+        makeup_spec[12] = (lip_color, DEFAULT_INTENSITY)  # 윗입술
+        makeup_spec[13] = (lip_color, DEFAULT_INTENSITY)  # 아랫입술
+    with metrics.timed('makeup'):
+        img_makeup = apply_makeup(img_bgr, parsing_resized, makeup_spec)
 
     # 결과 이미지 저장
     result_filename = f"makeover_{palette_num}_{filename}"
     result_path = os.path.join(app.config['UPLOAD_FOLDER'], result_filename)
-    cv2.imwrite(result_path, img_makeup)
+    with metrics.timed('imwrite'):
+        cv2.imwrite(result_path, img_makeup)
 
     return render_template("makeover.html",
                            original_image=filename,
@@ -566,47 +973,43 @@ def apply_makeup_realtime():
 
     try:
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        img_bgr = cv2.imread(filepath)
+        with metrics.timed('decode'):
+            img_bgr, cache_key = read_upload(filepath)
         if img_bgr is None:
             return jsonify({'success': False, 'error': '원본 이미지를 찾을 수 없습니다.'}), 404
+        if get_cached_parsing(img_bgr, cache_key) is None and not wait_for_models(parsing_models(cache_key)):
+            return jsonify({'success': False, 'error': 'AI 모델이 로드되지 않았습니다.'}), 503
 
-        img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-
-        img_pil_resized = Image.fromarray(img_rgb).resize((512, 512))
-        img_tensor = to_tensor(img_pil_resized).unsqueeze(0)
-        with torch.no_grad():
-            out = face_parsing_net(img_tensor)[0]
-        parsing = out.squeeze(0).cpu().numpy().argmax(0)
-        parsing_resized = np.array(Image.fromarray(parsing.astype(np.uint8)).resize((img_rgb.shape[1], img_rgb.shape[0]), Image.NEAREST))
-
-        img_makeup = img_bgr.copy()
+        with metrics.timed('parsing'):
+            parsing_resized = get_parsing_map(img_bgr, cache_key)
 
-        # Apply makeup with individual intensities
+        # Apply makeup with individual intensities in a single pass
+        makeup_spec = {}
         if 'hair' in colors and colors['hair']:
-            hair_color = hex_to_bgr(colors['hair'])
-            hair_intensity = intensities.get('hair', 0.75)
-            img_makeup = hair(img_makeup, parsing_resized, 17, hair_color, intensity=hair_intensity)
-        
+            makeup_spec[17] = (hex_to_bgr(colors['hair']), intensities.get('hair', DEFAULT_INTENSITY))
+
         if 'lips' in colors and colors['lips']:
             lip_color = hex_to_bgr(colors['lips'])
-            lips_intensity = intensities.get('lips', 0.75)
-            img_makeup = hair(img_makeup, parsing_resized, 12, lip_color, intensity=lips_intensity)
-            img_makeup = hair(img_makeup, parsing_resized, 13, lip_color, intensity=lips_intensity)
+            lips_intensity = intensities.get('lips', DEFAULT_INTENSITY)
+            makeup_spec[12] = (lip_color, lips_intensity)
+            makeup_spec[13] = (lip_color, lips_intensity)
 
         if 'lens' in colors and colors['lens']:
             lens_color = hex_to_bgr(colors['lens'])
-            lens_intensity = intensities.get('lens', 0.75)
-            img_makeup = hair(img_makeup, parsing_resized, 4, lens_color, intensity=lens_intensity)
-            img_makeup = hair(img_makeup, parsing_resized, 5, lens_color, intensity=lens_intensity)
+            lens_intensity = intensities.get('lens', DEFAULT_INTENSITY)
+            makeup_spec[4] = (lens_color, lens_intensity)
+            makeup_spec[5] = (lens_color, lens_intensity)
 
         if 'clothes' in colors and colors['clothes']:
-            clothes_color = hex_to_bgr(colors['clothes'])
-            clothes_intensity = intensities.get('clothes', 0.75)
-            img_makeup = hair(img_makeup, parsing_resized, 16, clothes_color, intensity=clothes_intensity)
+            makeup_spec[16] = (hex_to_bgr(colors['clothes']), intensities.get('clothes', DEFAULT_INTENSITY))
+
+        with metrics.timed('makeup'):
+            img_makeup = apply_makeup(img_bgr, parsing_resized, makeup_spec)
 
         result_filename = f"dev_{int(time.time())}_{filename}"
         result_path = os.path.join(app.config['UPLOAD_FOLDER'], result_filename)
-        cv2.imwrite(result_path, img_makeup)
+        with metrics.timed('imwrite'):
+            cv2.imwrite(result_path, img_makeup)
 
         return jsonify({
             'success': True,
@@ -825,14 +1228,18 @@ def get_profile():
 # ==============================================================================
 # 메인 실행 부분
 # ==============================================================================
+# 개발 서버용입니다. 프로덕션은 gunicorn -c gunicorn.conf.py wsgi:application (모델 1회 로드 후 워커 포크)
 if __name__ == '__main__':
-    load_models()
-    
-    print("=" * 70)
-    print(f"🚀 Enhanced Personal Color & Makeover Server Starting...")
-    print(f"📱 Model Status: {{'✅ Loaded' if models_loaded else '❌ Failed'}}")
-    print(f"🖥️  Device: {device}")
-    print(f"🌐 Server: http://127.0.0.1:5001")
-    print("=" * 70)
+    # debug 리로더는 감시용 부모 프로세스와 실제 서버 자식 프로세스(WERKZEUG_RUN_MAIN=true)로 나뉘므로
+    # 모델은 자식에서만 로드
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        load_models()
+        
+        print("=" * 70)
+        print(f"🚀 Enhanced Personal Color & Makeover Server Starting...")
+        print(f"📱 Model Status: loading in background (GET /ready)")
+        print(f"🖥️  Device: {device}")
+        print(f"🌐 Server: http://127.0.0.1:5001")
+        print("=" * 70)
     
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -0,0 +1,80 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    동시에 들어온 요청을 최대 max_wait_ms 동안 또는 max_batch_size 개까지 모아
+    process_batch(items) -> results 를 한 번에 실행하고, 각 호출자에게 자기 결과를 돌려주는 스케줄러.
+    워커 스레드는 첫 요청 시(포크된 프로세스에서는 포크 이후) 시작됩니다.
+    호출자는 결과를 최대 result_timeout 초 기다립니다 (None이면 무제한).
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=5, name='micro-batcher', result_timeout=60):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.result_timeout = result_timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # 포크 이후에는 부모의 큐와 스레드를 쓸 수 없으므로 새로 만듦
+                self._queue = queue.Queue()
+                self._worker = None
+                self._pid = os.getpid()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, args=(self._queue,), name=self.name, daemon=True)
+                self._worker.start()
+            return self._queue
+
+    def submit(self, item):
+        """항목을 큐에 넣고 결과를 받을 Future를 반환"""
+        future = Future()
+        self._ensure_worker().put((item, future))
+        return future
+
+    def __call__(self, item):
+        """항목 하나를 처리하고 결과를 기다려 반환 (result_timeout 초가 지나면 TimeoutError)"""
+        return self.submit(item).result(timeout=self.result_timeout)
+
+    def qsize(self):
+        """처리를 기다리는 요청 수"""
+        return self._queue.qsize()
+
+    def _collect(self, q):
+        batch = [q.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, q):
+        while True:
+            batch = self._collect(q)
+            try:
+                results = self.process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    # 결과가 모자라면 일부 호출자가 영원히 기다리게 되므로 배치 전체를 실패 처리
+                    raise RuntimeError(f"{self.name}: process_batch returned {len(results)} results "
+                                       f"for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
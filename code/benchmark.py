@@ -0,0 +1,364 @@
+"""
+이미지 파이프라인 마이크로 벤치마크.
+
+오프라인 CPU 환경에서 번들 이미지(static/image/*_example.jpg, uploads/)와 합성 데이터로
+조명 보정, 메이크업 합성, 샤프닝, BiSeNet 추론, 피부색 KMeans, 퍼스널 컬러 분류, PDF 리포트 생성을 측정합니다.
+
+    python benchmark.py run --output benchmarks/current.json
+    python benchmark.py run --output benchmarks/baseline.json   # 기준값 저장
+    python benchmark.py compare benchmarks/baseline.json benchmarks/current.json --threshold 0.15
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BENCH_SEED = 1234
+DEFAULT_REPEAT = 5
+
+# 해상도별 조명 보정 측정 크기 (w, h)
+LIGHTING_SIZES = {'448': (448, 448), '1080p': (1440, 1080), '12mp': (4000, 3000)}
+# 측정하는 BiSeNet 백엔드 (bisenet_backends.EXPORT_BACKENDS와 int8, torch를 import하기 전에 --filter 확인용)
+BISENET_CASE_BACKENDS = ('fused', 'torchscript', 'onnx', 'int8')
+
+
+def load_sample_images():
+    """번들 이미지를 BGR로 읽어 반환 (없으면 합성 이미지)"""
+    paths = sorted(glob.glob(os.path.join('static', 'image', '*_example.jpg')) +
+                   glob.glob(os.path.join('uploads', '*.jpg')))
+    images = [img for img in (cv2.imread(p) for p in paths) if img is not None]
+    if not images:
+        rng = np.random.default_rng(BENCH_SEED)
+        images = [cv2.GaussianBlur((rng.random((962, 735, 3)) * 255).astype(np.uint8), (0, 0), 3)]
+    return images
+
+
+def synthetic_parsing(shape):
+    """얼굴 사진 배치를 흉내 낸 BiSeNet 라벨 맵 (헤어, 얼굴, 눈, 입술, 옷)"""
+    h, w = shape
+    parsing = np.zeros((h, w), dtype=np.uint8)
+    cx, cy = w // 2, int(h * 0.45)
+    cv2.ellipse(parsing, (cx, int(h * 0.38)), (int(w * 0.36), int(h * 0.34)), 0, 0, 360, 17, -1)
+    cv2.ellipse(parsing, (cx, cy), (int(w * 0.25), int(h * 0.28)), 0, 0, 360, 1, -1)
+    eye_r = max(w // 40, 2)
+    cv2.circle(parsing, (cx - w // 10, cy - h // 16), eye_r, 4, -1)
+    cv2.circle(parsing, (cx + w // 10, cy - h // 16), eye_r, 5, -1)
+    cv2.ellipse(parsing, (cx, cy + h // 8), (w // 12, h // 80 + 1), 0, 180, 360, 12, -1)
+    cv2.ellipse(parsing, (cx, cy + h // 8), (w // 12, h // 60 + 1), 0, 0, 180, 13, -1)
+    parsing[int(h * 0.85):, :] = 16
+    return parsing
+
+
+def synthetic_skin_pixels(n=40000):
+    """피부 영역 Lab 픽셀을 흉내 낸 합성 데이터"""
+    rng = np.random.default_rng(BENCH_SEED)
+    centers = rng.normal([165, 140, 150], [20, 5, 6], size=(7, 3))
+    labels = rng.integers(0, 7, size=n)
+    pixels = centers[labels] + rng.normal(0, 4, size=(n, 3))
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def synthetic_features(scaler, n=1024):
+    """scaler의 학습 분포를 따르는 피부 대표색 특징 (n, 21) float32 (앱의 대표색과 같은 dtype)"""
+    rng = np.random.default_rng(BENCH_SEED)
+    return scaler.inverse_transform(rng.normal(size=(n, scaler.mean_.shape[0]))).astype(np.float32)
+
+
+def time_case(fn, repeat):
+    """1회 워밍업 후 repeat회 실행 시간(초)을 측정"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        'median': statistics.median(samples), 'min': min(samples),
+        'mean': statistics.fmean(samples), 'repeat': repeat
+    }
+
+
+def lighting_cases(images, wanted, work_dir):
+    from PIL import Image
+    from lighting import (LIGHTING_PIPELINES, LIGHTING_RESOLUTIONS, comprehensive_lighting_correction,
+                          lab_lighting_correction, prepare_analysis_image)
+
+    base = cv2.cvtColor(images[0], cv2.COLOR_BGR2RGB)
+    cases = {}
+    for label, size in LIGHTING_SIZES.items():
+        img = cv2.resize(base, size, interpolation=cv2.INTER_LINEAR)
+        dark = (img * 0.35).astype(np.uint8)
+        cases[f'lighting_correction[{label}]'] = lambda img=img: comprehensive_lighting_correction(img)
+        cases[f'lighting_correction_dark[{label}]'] = lambda img=dark: comprehensive_lighting_correction(img)
+        cases[f'lab_lighting_correction[{label}]'] = lambda img=img: lab_lighting_correction(img)
+        cases[f'lab_lighting_correction_dark[{label}]'] = lambda img=dark: lab_lighting_correction(img)
+
+    # /analyze 전처리 전체 (카메라 입력의 양방향 필터 포함)
+    upload = Image.fromarray(cv2.resize(base, LIGHTING_SIZES['12mp'], interpolation=cv2.INTER_LINEAR))
+    for resolution in LIGHTING_RESOLUTIONS:
+        for pipeline in LIGHTING_PIPELINES:
+            cases[f'prepare_analysis_image[12mp,{resolution},{pipeline}]'] = (
+                lambda resolution=resolution, pipeline=pipeline: prepare_analysis_image(
+                    upload, is_camera_input=True, resolution=resolution, pipeline=pipeline))
+    return cases
+
+
+def makeup_cases(images, wanted, work_dir):
+    import makeup
+
+    img = images[-1]
+    parsing = synthetic_parsing(img.shape[:2])
+    color = [40, 60, 190]
+    cases = {}
+    for part in (17, 16, 12, 13, 4, 5):
+        cases[f'makeup.hair[{part}]'] = lambda part=part: makeup.hair(img, parsing, part, color)
+    spec = {part: (color, makeup.DEFAULT_INTENSITY) for part in (17, 16, 12, 13, 4, 5)}
+    cases['makeup.apply_makeup[6 parts]'] = lambda: makeup.apply_makeup(img, parsing, spec)
+
+    solid = np.zeros_like(img)
+    solid[:, :] = color
+    cases['makeup.soft_light_blend[full]'] = lambda: makeup.soft_light_blend(img, solid)
+    cases['makeup.apply_blend[full]'] = lambda: makeup.apply_blend(img, color)
+    for mode in makeup.SHARPEN_MODES:
+        cases[f'makeup.sharpen[{mode}]'] = lambda mode=mode: makeup.sharpen(img, mode)
+    return cases
+
+
+def bisenet_cases(images, wanted, work_dir):
+    # 내보내기와 int8 보정은 오래 걸리므로 --filter에 맞는 케이스가 있는 백엔드만 준비
+    backends = [backend for backend in BISENET_CASE_BACKENDS
+                if wanted(f'bisenet.parse[{backend},1x512]') or wanted(f'bisenet.parse[{backend},4x512]')]
+    eager_names = ('bisenet.forward[1x512]', 'bisenet.parse[1x512]', 'bisenet.parse[4x512]')
+    if not backends and not any(wanted(name) for name in eager_names):
+        return {}
+
+    import torch
+    from bisenet_backends import EXPORT_BACKENDS, export_backend, load_bisenet
+    from model import BiSeNet, load_inference_model
+
+    try:
+        net = load_inference_model(os.path.join('res', 'cp', '79999_iter.pth'))
+    except Exception:
+        # 체크포인트가 없으면 같은 구조의 무작위 가중치로 속도만 측정
+        torch.manual_seed(BENCH_SEED)
+        net = BiSeNet(n_classes=19, pretrained=False)
+        net.eval()
+
+    x1 = torch.randn(1, 3, 512, 512, generator=torch.Generator().manual_seed(BENCH_SEED))
+    x4 = x1.repeat(4, 1, 1, 1)
+
+    def forward(x):
+        with torch.inference_mode():
+            return net(x)[0].argmax(1)
+
+    def parse(x):
+        with torch.inference_mode():
+            return net.parse(x)
+
+    cases = {
+        'bisenet.forward[1x512]': lambda: forward(x1),
+        'bisenet.parse[1x512]': lambda: parse(x1),
+        'bisenet.parse[4x512]': lambda: parse(x4),
+    }
+
+    # 같은 가중치를 임시 폴더로 내보내 TorchScript / ONNX Runtime 백엔드 비교
+    checkpoint = os.path.join(work_dir, 'bisenet.pth')
+    torch.save(net.state_dict(), checkpoint)
+    for backend in EXPORT_BACKENDS:
+        if backend not in backends:
+            continue
+        try:
+            export_backend(net, checkpoint, backend)
+            backend_net = load_bisenet(checkpoint, backend)
+        except Exception as e:
+            # onnxruntime 미설치, 내보내기 실패 등은 그 백엔드만 건너뜀
+            print(f"- skip bisenet {backend}: {e}")
+            continue
+
+        def backend_parse(x, backend_net=backend_net):
+            with torch.inference_mode():
+                return backend_net.parse(x)
+
+        cases[f'bisenet.parse[{backend},1x512]'] = lambda backend_parse=backend_parse: backend_parse(x1)
+        cases[f'bisenet.parse[{backend},4x512]'] = lambda backend_parse=backend_parse: backend_parse(x4)
+
+    if 'int8' not in backends:
+        return cases
+    # int8 정적 양자화 (벤치마크 입력 하나로 보정, 속도 측정용)
+    try:
+        from quantize_bisenet import quantize_parse_model
+        int8_net = quantize_parse_model(net, [x1])
+    except Exception as e:
+        # 양자화 엔진이 없거나 FX 추적에 실패하면 int8 케이스만 건너뜀
+        print(f"- skip bisenet int8: {e}")
+        return cases
+
+    def int8_parse(x):
+        with torch.inference_mode():
+            return int8_net(x)
+
+    cases['bisenet.parse[int8,1x512]'] = lambda: int8_parse(x1)
+    cases['bisenet.parse[int8,4x512]'] = lambda: int8_parse(x4)
+    return cases
+
+
+def skin_cluster_cases(images, wanted, work_dir):
+    from quantizer import SKIN_QUANTIZERS, skin_color_centers
+
+    skin_pixels = synthetic_skin_pixels()
+    return {f'skin_kmeans[{method}]': (lambda method=method: skin_color_centers(skin_pixels, 7, method=method))
+            for method in SKIN_QUANTIZERS}
+
+
+def report_cases(images, wanted, work_dir):
+    if not wanted('generate_report_pdf'):
+        return {}
+    from pdf import generate_report_pdf
+
+    # app.py의 CLUSTER_DESCRIPTIONS[0]과 같은 형식 (app은 Firebase 키가 있어야 import 가능)
+    cluster_info = {
+        "name": "Golden",
+        "visual_name": "골든 타입",
+        "description": "햇살처럼 따뜻하고 생기 넘치는 골드 톤입니다.",
+        "palette": ["#FFE999", "#f7e6b5", "#E8A317", "#FFC800", "#E07223"]
+    }
+    out_dir = os.path.join(work_dir, 'pdf')
+    os.makedirs(out_dir, exist_ok=True)
+    original = os.path.join(out_dir, 'original.jpg')
+    result = os.path.join(out_dir, 'result.jpg')
+    cv2.imwrite(original, images[0])
+    cv2.imwrite(result, images[-1])
+    return {'generate_report_pdf': lambda: generate_report_pdf(original, result, cluster_info, {},
+                                                               output_folder=out_dir)}
+
+
+def classify_cases(images, wanted, work_dir):
+    if not any(wanted(f'classify[{method},{label}]') for method in ('sklearn', 'numpy') for label in ('1', '1024')):
+        return {}
+    import joblib
+    from classifier import PersonalColorClassifier
+
+    scaler = joblib.load('scaler.joblib')
+    kmeans_model = joblib.load('kmeans_model.joblib')
+    classifier = PersonalColorClassifier.from_sklearn(scaler, kmeans_model)
+    features = synthetic_features(scaler)
+    cases = {}
+    for label, batch in (('1', features[:1]), ('1024', features)):
+        cases[f'classify[sklearn,{label}]'] = lambda batch=batch: kmeans_model.predict(scaler.transform(batch))
+        cases[f'classify[numpy,{label}]'] = lambda batch=batch: classifier.predict(batch)
+    return cases
+
+
+CASE_GROUPS = [lighting_cases, makeup_cases, bisenet_cases, skin_cluster_cases, classify_cases, report_cases]
+
+
+def environment_info():
+    info = {
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'opencv': cv2.__version__,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def run(args):
+    cv2.setRNGSeed(BENCH_SEED)
+    images = load_sample_images()
+    results, skipped = {}, {}
+
+    def wanted(name):
+        return not args.filter or args.filter in name
+
+    for group in CASE_GROUPS:
+        # 내보낸 모델, PDF 등 그룹이 만드는 파일은 그룹이 끝나면 삭제
+        with tempfile.TemporaryDirectory(prefix=f'bench_{group.__name__}_') as work_dir:
+            try:
+                cases = group(images, wanted, work_dir)
+            except ImportError as e:
+                # 선택적 의존성이 없는 그룹은 건너뜀
+                skipped[group.__name__] = str(e)
+                print(f"- skip {group.__name__}: {e}")
+                continue
+            for name, fn in cases.items():
+                if not wanted(name):
+                    continue
+                results[name] = time_case(fn, args.repeat)
+                print(f"{name:<40} median {results[name]['median'] * 1000:9.2f} ms  "
+                      f"min {results[name]['min'] * 1000:9.2f} ms")
+
+    report = {'environment': environment_info(), 'results': results, 'skipped': skipped}
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            print(f"{name:<40} {'(only in ' + ('current' if name in current else 'baseline') + ')':>30}")
+            continue
+        before, after = baseline[name]['median'], current[name]['median']
+        change = (after - before) / before if before > 0 else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = '  faster'
+        print(f"{name:<40} {before * 1000:9.2f} -> {after * 1000:9.2f} ms  {change * 100:+7.1f}%{flag}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        return 1
+    print("No regressions.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='beautiAI image pipeline micro-benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help='run the benchmarks and write JSON results')
+    run_parser.add_argument('--output', default=os.path.join('benchmarks', 'current.json'))
+    run_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument('--filter', default=None, help='only run cases whose name contains this text')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser('compare', help='compare results against a stored baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.15,
+                                help='relative slowdown of the median that counts as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    # 번들 리소스의 상대 경로(static/, uploads/, res/) 기준으로 실행
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
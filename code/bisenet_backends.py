@@ -0,0 +1,310 @@
+"""
+가상 메이크업용 BiSeNet 실행 백엔드와 내보내기 도구.
+
+체크포인트(res/cp/79999_iter.pth)의 label-only parse() 경로를 TorchScript와 ONNX로 내보내고,
+load_bisenet()으로 eager / BatchNorm 접기 + channels_last(fused) / TorchScript / ONNX Runtime(CPU) / int8 양자화
+모델 중 하나를 같은 parse(x) 인터페이스로 로드합니다. 내보낸 파일은 체크포인트 옆에 저장됩니다
+(79999_iter.fused.pth, 79999_iter.ts.pt, 79999_iter.onnx, quantize_bisenet.py의 79999_iter.int8.ts.pt).
+내보내기와 파리티 확인은 모델 추론이 필요하므로 서버 로드 중(gunicorn preload 마스터 등)이 아니라 아래 명령으로 미리 실행합니다.
+
+    python bisenet_backends.py export --checkpoint res/cp/79999_iter.pth
+    python bisenet_backends.py parity --checkpoint res/cp/79999_iter.pth --min-agreement 0.999
+"""
+import argparse
+import copy
+import glob
+import inspect
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from model import fold_batchnorm, load_inference_model
+
+BISENET_BACKENDS = ('eager', 'fused', 'torchscript', 'onnx', 'int8')
+# eager와 같은 라벨을 내야 하는 내보내기 백엔드 (int8은 quantize_bisenet.py calibrate로 만듦)
+EXPORT_BACKENDS = ('fused', 'torchscript', 'onnx')
+MODEL_SUFFIXES = {'fused': '.fused.pth', 'torchscript': '.ts.pt', 'onnx': '.onnx', 'int8': '.int8.ts.pt'}
+# BatchNorm 접기 전후 주 출력 logits의 허용 오차 (최대 절대값 대비)
+FOLD_TOLERANCE = 1e-4
+EXPORT_SIZE = 512
+ONNX_OPSET = 17
+DEFAULT_CHECKPOINT = os.path.join('res', 'cp', '79999_iter.pth')
+DEFAULT_IMAGES = [os.path.join('static', 'image', '*.jpg'), os.path.join('static', 'image', '*.png'),
+                  os.path.join('uploads', '*.jpg')]
+
+
+class _ParseModule(nn.Module):
+    """BiSeNet.parse()를 forward로 노출하는 내보내기용 래퍼 (입력 (N, 3, H, W) -> (N, H, W) uint8)"""
+
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        return self.net.parse(x)
+
+
+def exported_path(checkpoint_path, backend):
+    """체크포인트 옆에 저장되는 내보낸 모델 경로"""
+    return os.path.splitext(checkpoint_path)[0] + MODEL_SUFFIXES[backend]
+
+
+def _atomic_write(path, write):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def check_fold_parity(reference, folded, size=256, tolerance=FOLD_TOLERANCE):
+    """
+    고정 시드 입력에서 BatchNorm을 접은 모델의 주 출력 logits가 원래 모델과 float 오차 이내인지 확인하고
+    상대 최대 오차를 반환 (넘으면 RuntimeError)
+    """
+    x = torch.randn(1, 3, size, size, generator=torch.Generator().manual_seed(0))
+    with torch.inference_mode():
+        expected = reference(x)[0]
+        actual = folded(x)[0]
+    error = float((actual - expected).abs().max() / expected.abs().max().clamp(min=1e-12))
+    if error > tolerance:
+        raise RuntimeError(f"BatchNorm folding changed the logits by {error:.2e} (tolerance {tolerance:.0e})")
+    return error
+
+
+def export_fused(net, path):
+    """BatchNorm을 접은 가중치를 파리티 확인 후 state_dict로 저장 (net은 바꾸지 않음)"""
+    folded = fold_batchnorm(copy.deepcopy(net))
+    check_fold_parity(net, folded)
+    _atomic_write(path, lambda tmp_path: torch.save(folded.state_dict(), tmp_path))
+    return path
+
+
+def exported_model(checkpoint_path, backend):
+    """내보낸 모델 경로를 반환 (없거나 체크포인트보다 오래되었으면 FileNotFoundError)"""
+    path = exported_path(checkpoint_path, backend)
+    command = 'quantize_bisenet.py calibrate' if backend == 'int8' else f'bisenet_backends.py export --backends {backend}'
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run 'python {command}' first")
+    if os.path.exists(checkpoint_path) and os.path.getmtime(path) < os.path.getmtime(checkpoint_path):
+        raise FileNotFoundError(f"{path} is older than {checkpoint_path}; run 'python {command}' again")
+    return path
+
+
+def load_fused(checkpoint_path, n_classes=19, channels_last=True):
+    """
+    export 명령으로 BatchNorm을 접어 저장한 가중치(79999_iter.fused.pth)를 channels_last BiSeNet으로 로드.
+    로드할 때는 추론을 하지 않으며, 접은 가중치가 없거나 체크포인트보다 오래되었으면 FileNotFoundError입니다.
+    """
+    net = load_inference_model(exported_model(checkpoint_path, 'fused'), n_classes=n_classes, folded=True)
+    return net.to_channels_last() if channels_last else net
+
+
+def export_torchscript(net, path, size=EXPORT_SIZE):
+    """parse 경로를 추적(trace)해 고정(freeze)한 TorchScript 모델로 저장 (배치·해상도는 입력에 따라 변함)"""
+    example = torch.zeros(1, 3, size, size)
+    with torch.no_grad():
+        traced = torch.jit.trace(_ParseModule(net).eval(), example, check_trace=False)
+        traced = torch.jit.freeze(traced)
+    _atomic_write(path, lambda tmp_path: torch.jit.save(traced, tmp_path))
+    return path
+
+
+def export_onnx(net, path, size=EXPORT_SIZE, opset=ONNX_OPSET):
+    """parse 경로를 배치·높이·너비가 동적인 ONNX 그래프로 저장"""
+    example = torch.zeros(1, 3, size, size)
+    kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # TorchScript 기반 내보내기 사용 (onnxscript 불필요)
+        kwargs['dynamo'] = False
+
+    def write(tmp_path):
+        with torch.no_grad():
+            torch.onnx.export(_ParseModule(net).eval(), example, tmp_path,
+                              input_names=['input'], output_names=['labels'],
+                              dynamic_axes={'input': {0: 'batch', 2: 'height', 3: 'width'},
+                                            'labels': {0: 'batch', 1: 'height', 2: 'width'}},
+                              opset_version=opset, **kwargs)
+
+    _atomic_write(path, write)
+    return path
+
+
+def export_backend(net, checkpoint_path, backend):
+    """eager BiSeNet을 backend 형식으로 체크포인트 옆에 내보내고 경로를 반환"""
+    path = exported_path(checkpoint_path, backend)
+    if backend == 'fused':
+        return export_fused(net, path)
+    if backend == 'torchscript':
+        return export_torchscript(net, path)
+    if backend == 'onnx':
+        return export_onnx(net, path)
+    raise ValueError(f"Backend {backend} cannot be exported")
+
+
+class TorchScriptBiSeNet:
+    """
+    내보낸 TorchScript 모델을 BiSeNet.parse()와 같은 인터페이스로 감싼 래퍼.
+    int8 모델은 저장할 때 쓴 양자화 엔진(x86, qnnpack 등)을 함께 기록하므로 로드 전에 같은 엔진을 선택합니다.
+    """
+
+    def __init__(self, path, map_location='cpu'):
+        self.path = path
+        extra_files = {'quantized_engine': ''}
+        self.module = torch.jit.load(path, map_location=map_location, _extra_files=extra_files)
+        engine = extra_files['quantized_engine']
+        if isinstance(engine, bytes):
+            engine = engine.decode()
+        if engine:
+            torch.backends.quantized.engine = engine
+            # 엔진을 바꾼 뒤 다시 로드해야 패킹된 가중치가 그 엔진 형식이 됨
+            self.module = torch.jit.load(path, map_location=map_location)
+        self.module.eval()
+
+    def parse(self, x):
+        return self.module(x)
+
+
+class OnnxBiSeNet:
+    """
+    ONNX Runtime(CPU 실행 공급자) 세션을 BiSeNet.parse()와 같은 인터페이스로 감싼 래퍼.
+    세션의 스레드 풀은 포크로 상속되지 않으므로 세션은 프로세스마다 첫 parse() 때 만듭니다 (gunicorn preload).
+    """
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime  # noqa: F401  로드 시점에 onnxruntime 설치 여부 확인 (없으면 ImportError)
+
+        self.path = path
+        self.num_threads = num_threads
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                import onnxruntime as ort
+
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                if self.num_threads:
+                    options.intra_op_num_threads = self.num_threads
+                self._session = ort.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+                self._pid = os.getpid()
+            return self._session
+
+    def parse(self, x):
+        labels = self.session.run(None, {'input': x.detach().cpu().float().numpy()})[0]
+        return torch.from_numpy(labels)
+
+
+def load_bisenet(checkpoint_path, backend='eager', n_classes=19, num_threads=None):
+    """
+    backend(BISENET_BACKENDS)로 실행하는 BiSeNet을 로드 (parse(x) -> (N, H, W) uint8 라벨).
+    eager 외의 백엔드는 export 명령(int8은 quantize_bisenet.py calibrate)으로 체크포인트 옆에 미리 내보낸 파일이
+    있어야 하며, 없거나 체크포인트보다 오래되었으면 FileNotFoundError입니다 (로드 중에는 추론이나 추적을 하지 않음).
+    num_threads는 ONNX Runtime 세션의 연산자 내부 스레드 수입니다 (torch 백엔드는 torch.set_num_threads를 따름).
+    """
+    if backend not in BISENET_BACKENDS:
+        raise ValueError(f"Unknown BiSeNet backend: {backend}")
+    if backend == 'eager':
+        return load_inference_model(checkpoint_path, n_classes=n_classes)
+    if backend == 'fused':
+        return load_fused(checkpoint_path, n_classes=n_classes)
+
+    path = exported_model(checkpoint_path, backend)
+    if backend == 'onnx':
+        return OnnxBiSeNet(path, num_threads=num_threads)
+    return TorchScriptBiSeNet(path)
+
+
+def load_parse_inputs(patterns, sizes):
+    """파리티 검사용 이미지를 app.to_tensor와 같은 정규화로 (이름, 크기, 텐서) 목록으로 만듦"""
+    from PIL import Image
+    from torchvision import transforms
+
+    to_tensor = transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize((0.485, 0.456, 0.406), (0.229, 0.224, 0.225)),
+    ])
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    inputs = []
+    for path in paths:
+        image = Image.open(path).convert('RGB')
+        for size in sizes:
+            inputs.append((path, size, to_tensor(image.resize((size, size))).unsqueeze(0)))
+    return inputs
+
+
+def export_command(args):
+    net = load_inference_model(args.checkpoint)
+    for backend in args.backends:
+        start = time.perf_counter()
+        path = export_backend(net, args.checkpoint, backend)
+        print(f"{backend:<12} -> {path} ({time.perf_counter() - start:.1f} s)")
+    return 0
+
+
+def parity_command(args):
+    """내보낸 백엔드의 라벨 맵이 eager parse()와 픽셀 단위로 일치하는지 번들 이미지로 비교"""
+    reference = load_inference_model(args.checkpoint)
+    nets = {backend: load_bisenet(args.checkpoint, backend) for backend in args.backends}
+    inputs = load_parse_inputs(args.images or DEFAULT_IMAGES, args.sizes)
+    if not inputs:
+        print("No parity images found.")
+        return 1
+
+    failed = False
+    for backend, net in nets.items():
+        agreements, timings = [], {'eager': [], backend: []}
+        with torch.inference_mode():
+            for path, size, x in inputs:
+                start = time.perf_counter()
+                expected = reference.parse(x).cpu().numpy()
+                timings['eager'].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                labels = net.parse(x).cpu().numpy()
+                timings[backend].append(time.perf_counter() - start)
+                agreements.append(float(np.mean(labels == expected)))
+                print(f"{backend:<12} {os.path.basename(path):<40} {size:4d}px agreement {agreements[-1] * 100:7.3f}%")
+        worst = min(agreements)
+        print(f"{backend}: worst pixel agreement {worst * 100:.3f}% over {len(inputs)} inputs, "
+              f"parse {np.mean(timings['eager']) * 1000:.1f} -> {np.mean(timings[backend]) * 1000:.1f} ms")
+        failed = failed or worst < args.min_agreement
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export BiSeNet and check exported backends against eager PyTorch')
+    sub = parser.add_subparsers(dest='command', required=True)
+    exportable = list(EXPORT_BACKENDS)
+
+    export_parser = sub.add_parser('export', help='write fused/TorchScript/ONNX models next to the checkpoint')
+    export_parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    export_parser.add_argument('--backends', nargs='+', choices=exportable, default=exportable)
+    export_parser.set_defaults(func=export_command)
+
+    parity_parser = sub.add_parser('parity', help='compare exported backends with eager parse() on sample images')
+    parity_parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parity_parser.add_argument('--backends', nargs='+', choices=exportable, default=exportable)
+    parity_parser.add_argument('--images', nargs='*', help='image glob patterns (default: bundled images)')
+    parity_parser.add_argument('--sizes', nargs='+', type=int, default=[512, 256])
+    parity_parser.add_argument('--min-agreement', type=float, default=0.999)
+    parity_parser.set_defaults(func=parity_command)
+
+    args = parser.parse_args(argv)
+    # 번들 리소스의 상대 경로(res/, static/, uploads/) 기준으로 실행
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import joblib
+import numpy as np
+
+
+class PersonalColorClassifier:
+    """
+    StandardScaler(scaler.joblib)와 KMeans(kmeans_model.joblib)를 로드 시점에 하나의 선형 점수 행렬로 접은
+    근사 퍼스널 컬러 분류기. sklearn의 predict와 라벨이 항상 같다고 보장하지 않습니다.
+
+        z = (x - mean) / scale
+        argmin_k ||z - c_k||^2 = argmin_k (x @ W + bias)_k
+        W = -2 * c_k / scale,  bias = ||c_k||^2 + 2 * (mean / scale) . c_k
+
+    입력은 float64로 계산하므로 float32로 거리를 계산하는 sklearn과 반올림·동점 처리가 다르고,
+    두 중심까지의 거리가 거의 같은 클러스터 경계 위의 점에서는 라벨이 달라질 수 있습니다.
+    sklearn의 호출당 입력 검증을 건너뛰는 것 외에 계산량은 같아 큰 배치에서는 빠르지 않습니다.
+    앱에서는 PERSONAL_COLOR_CLASSIFIER=fast로 선택할 때만 사용합니다 (기본값은 sklearn).
+    """
+
+    def __init__(self, mean, scale, centers):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centers = np.asarray(centers, dtype=np.float64)
+        self.n_clusters, self.n_features = self.centers.shape
+
+        inv_scale = 1.0 / self.scale
+        offset = self.mean * inv_scale
+        self.weights = -2.0 * (self.centers * inv_scale).T
+        self.bias = np.einsum('ij,ij->i', self.centers, self.centers) + 2.0 * (self.centers @ offset)
+        self._inv_scale = inv_scale
+        self._offset = offset
+        for array in (self.weights, self.bias, self._inv_scale, self._offset):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_sklearn(cls, scaler, kmeans_model):
+        """학습된 StandardScaler와 KMeans에서 분류기를 만듦"""
+        n_features = kmeans_model.cluster_centers_.shape[1]
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) and scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) and scaler.scale_ is not None else np.ones(n_features)
+        return cls(mean, scale, kmeans_model.cluster_centers_)
+
+    @classmethod
+    def load(cls, scaler_path, kmeans_path):
+        """scaler.joblib, kmeans_model.joblib 경로에서 분류기를 만듦"""
+        return cls.from_sklearn(joblib.load(scaler_path), joblib.load(kmeans_path))
+
+    def _check(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        if features.ndim == 1:
+            features = features.reshape(1, -1)
+        if features.ndim != 2 or features.shape[1] != self.n_features:
+            raise ValueError(f"Expected features with {self.n_features} columns, got shape {features.shape}")
+        return features
+
+    def transform(self, features):
+        """scaler.transform과 같은 표준화 결과 (n, n_features)"""
+        return self._check(features) * self._inv_scale - self._offset
+
+    def predict(self, features, return_distances=False):
+        """
+        특징 행 (n, n_features) 또는 (n_features,)의 클러스터 라벨 (n,)을 반환.
+        return_distances=True이면 표준화 공간에서 각 클러스터까지의 유클리드 거리 (n, n_clusters)도 함께 반환합니다.
+        """
+        features = self._check(features)
+        scores = features @ self.weights + self.bias
+        labels = np.argmin(scores, axis=1)
+        if not return_distances:
+            return labels
+        scaled = features * self._inv_scale - self._offset
+        squared = scores + np.einsum('ij,ij->i', scaled, scaled)[:, None]
+        return labels, np.sqrt(np.maximum(squared, 0.0))
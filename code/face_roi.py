@@ -0,0 +1,72 @@
+import numpy as np
+
+from parsing_cache import resize_parsing
+
+# 얼굴 영역 파싱 모드 설정
+#   'full' - 사진 전체를 512x512로 축소해 BiSeNet 파싱 (기존 동작)
+#   'face' - 검출한 얼굴 주변 정사각형 영역을 512x512로 파싱하고, 나머지(옷 등)는 전체 사진을 낮은 해상도로 파싱
+PARSE_REGIONS = ('full', 'face')
+
+# 얼굴 상자의 긴 변 대비 잘라낼 정사각형 한 변의 비율 (머리카락과 목이 들어가도록)
+FACE_CROP_EXPAND = 2.0
+# 잘라낼 영역의 중심을 얼굴 높이 대비 위로 옮기는 비율 (이마 위 머리카락 쪽)
+FACE_CROP_SHIFT = 0.1
+# 잘라낸 영역이 사진 면적의 이 비율 이상이면 얼굴 영역 파싱의 이득이 없으므로 전체 파싱
+FACE_CROP_MAX_AREA = 0.6
+
+
+def face_crop_box(rect, shape, expand=FACE_CROP_EXPAND, shift=FACE_CROP_SHIFT):
+    """
+    얼굴 상자 (x1, y1, x2, y2)를 넓힌 정사각형 영역 (left, top, right, bottom)을 반환.
+    영역은 사진 (h, w) 안에 들어오도록 한 변을 줄이거나 위치를 옮깁니다.
+    """
+    h, w = shape
+    x1, y1, x2, y2 = (float(v) for v in rect)
+    side = int(round(expand * max(x2 - x1, y2 - y1)))
+    side = max(min(side, h, w), 1)
+    cx = (x1 + x2) / 2
+    cy = (y1 + y2) / 2 - shift * (y2 - y1)
+    left = int(np.clip(round(cx - side / 2), 0, w - side))
+    top = int(np.clip(round(cy - side / 2), 0, h - side))
+    return left, top, left + side, top + side
+
+
+def crop_area_ratio(box, shape):
+    """잘라낼 영역이 사진 전체에서 차지하는 면적 비율"""
+    left, top, right, bottom = box
+    return (right - left) * (bottom - top) / float(shape[0] * shape[1])
+
+
+def compact_box(box, shape, size=512):
+    """
+    잘라낸 영역의 한 변이 size(파싱 해상도)가 되도록 사진 (h, w)를 줄인 크기와 그 안의 영역을 반환.
+    원본보다 키우지는 않으며, 합친 라벨 맵을 원본 대신 이 크기로 캐시에 저장하는 데 씁니다.
+    """
+    h, w = shape
+    left, top, right, bottom = box
+    scale = min(1.0, size / float(right - left))
+    ch, cw = max(int(round(h * scale)), 1), max(int(round(w * scale)), 1)
+    sx, sy = cw / float(w), ch / float(h)
+    scaled = (int(round(left * sx)), int(round(top * sy)), int(round(right * sx)), int(round(bottom * sy)))
+    left, top = min(scaled[0], cw - 1), min(scaled[1], ch - 1)
+    return (ch, cw), (left, top, max(min(scaled[2], cw), left + 1), max(min(scaled[3], ch), top + 1))
+
+
+def compose_parsing(coarse, fine, box, shape):
+    """
+    낮은 해상도의 전체 사진 라벨 맵(coarse)을 원본 크기 (h, w)로 키운 뒤
+    얼굴 영역 라벨 맵(fine)을 box 위치에 붙여 넣은 원본 크기 라벨 맵을 반환
+    """
+    left, top, right, bottom = box
+    parsing = resize_parsing(coarse, shape)
+    parsing[top:bottom, left:right] = resize_parsing(fine, (bottom - top, right - left))
+    return parsing
+
+
+def fill_background(face, coarse):
+    """
+    얼굴 주변만 라벨이 있는 라벨 맵(face, /analyze의 FaRL 분할 결과 등)의 배경 픽셀을
+    전체 사진 라벨 맵(coarse)을 같은 크기로 키운 값으로 채움 (얼굴 밖의 머리카락, 옷 등)
+    """
+    coarse = resize_parsing(coarse, face.shape)
+    return np.where(face != 0, face, coarse).astype(np.uint8)
@@ -0,0 +1,39 @@
+"""
+gunicorn 설정 (wsgi.py 참고).
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+    WEB_CONCURRENCY=4 GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:application
+"""
+import gc
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# SSE 진행 상황 스트림과 오래 걸리는 분석 요청이 워커를 막지 않도록 스레드 워커 사용
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# /metrics 지표는 워커 프로세스별로 집계됩니다 (스크레이프마다 요청을 받은 워커 하나의 값).
+# 워커 전체 합계가 필요하면 워커 수를 1로 두거나 워커별로 스크레이프해 합산하세요.
+
+# 마스터에서 앱과 모델을 한 번 로드한 뒤 포크 (워커 간 가중치 copy-on-write 공유)
+preload_app = True
+
+# app.py의 CPU 스레드 예산이 실제 워커 수로 계산되도록 import 전에 알려줌 (-w 옵션은 반영되지 않음)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+
+def pre_fork(server, worker):
+    # 로드된 모델 객체를 GC 추적 대상에서 빼서, 워커의 GC가 공유 페이지에 쓰지(복사하지) 않도록 함
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # OpenMP/BLAS 스레드 풀은 포크로 상속되지 않으므로 워커에서 스레드 예산을 다시 적용
+    from runtime import apply_thread_budget, runtime_info
+
+    budget = runtime_info()['budget']
+    if budget:
+        apply_thread_budget(budget)
@@ -0,0 +1,108 @@
+import contextvars
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# 분석 파이프라인 단계 (순서대로 진행률 계산에 사용)
+ANALYSIS_STAGES = ['decode', 'correct', 'detect', 'parse', 'cluster', 'classify']
+
+
+class JobQueueFull(Exception):
+    """대기 중인 작업이 너무 많아 새 작업을 받을 수 없을 때 발생"""
+
+
+class JobManager:
+    """
+    제한된 워커 풀에서 오래 걸리는 작업을 실행하고 단계별 진행 상황을 보관하는 작업 관리자.
+    작업 함수는 progress(stage) 콜백을 받아 현재 단계를 알리고 (payload, status_code)를 반환합니다.
+    """
+
+    def __init__(self, stages, max_workers=2, max_pending=32, ttl_seconds=600):
+        self.stages = list(stages)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # 포크 이후 첫 작업에서 워커 풀을 새로 만듦
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job-worker')
+            self._pid = os.getpid()
+        return self._executor
+
+    def _purge_expired(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in ('done', 'failed') and now - job['updated_at'] > self.ttl_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def pending_count(self):
+        """대기 또는 실행 중인 작업 수"""
+        with self._cond:
+            return sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+
+    def submit(self, fn, *args, owner=None, **kwargs):
+        """작업을 등록하고 작업 ID를 반환 (대기열이 가득 차면 JobQueueFull)"""
+        with self._cond:
+            self._purge_expired()
+            pending = sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+            if pending >= self.max_pending:
+                raise JobQueueFull()
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._jobs[job_id] = {
+                'job_id': job_id, 'owner': owner, 'status': 'queued', 'stage': None, 'progress': 0,
+                'result': None, 'status_code': None, 'created_at': now, 'updated_at': now, 'version': 0
+            }
+            # 제출한 요청의 컨텍스트(지표 라벨 등)를 워커에서도 유지
+            context = contextvars.copy_context()
+            self._get_executor().submit(context.run, self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job['updated_at'] = time.time()
+            job['version'] += 1
+            self._cond.notify_all()
+
+    def _run(self, job_id, fn, args, kwargs):
+        def progress(stage):
+            progress_pct = int(100 * self.stages.index(stage) / len(self.stages)) if stage in self.stages else 0
+            self._update(job_id, stage=stage, progress=progress_pct)
+
+        self._update(job_id, status='running')
+        try:
+            payload, status_code = fn(*args, progress=progress, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            payload, status_code = {'error': f'분석 중 오류가 발생했습니다: {str(e)}'}, 500
+        if status_code < 400:
+            self._update(job_id, status='done', progress=100, result=payload, status_code=status_code)
+        else:
+            self._update(job_id, status='failed', result=payload, status_code=status_code)
+
+    def get(self, job_id):
+        """작업 상태의 스냅샷을 반환 (없으면 None)"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait_for_update(self, job_id, version, timeout=15.0):
+        """작업의 version이 바뀌거나 timeout이 지날 때까지 기다린 뒤 스냅샷을 반환"""
+        with self._cond:
+            self._cond.wait_for(lambda: job_id not in self._jobs or self._jobs[job_id]['version'] != version,
+                                timeout=timeout)
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
@@ -0,0 +1,280 @@
+from contextlib import nullcontext
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# facer 분석 입력 크기
+ANALYSIS_SIZE = (448, 448)
+
+# 조명 보정을 수행할 해상도
+#   'full'     - 원본 업로드 크기에서 보정한 뒤 분석 크기로 축소 (기존 동작)
+#   'analysis' - 먼저 분석 크기로 축소하고, 통계 계산과 보정을 축소 이미지에서 수행
+LIGHTING_RESOLUTIONS = ('full', 'analysis')
+
+# 카메라 입력 노이즈 제거용 양방향 필터 (원본 해상도 기준 지름)
+BILATERAL_DIAMETER = 9
+
+# 파라미터 조합별 톤 커브 LUT 캐시 크기 (파이프라인은 몇 가지 고정 파라미터만 사용)
+TONE_CURVE_CACHE_SIZE = 64
+
+# 조명 보정 파이프라인
+#   'reference' - comprehensive_lighting_correction (기존 결과)
+#   'lab'       - lab_lighting_correction (LAB 변환을 한 번만 하는 빠른 근사)
+LIGHTING_PIPELINES = ('reference', 'lab')
+
+
+def _lighting_info(mean_brightness, std_brightness, dark_pixels, bright_pixels):
+    return {
+        'mean_brightness': mean_brightness, 'std_brightness': std_brightness,
+        'dark_ratio': dark_pixels, 'bright_ratio': bright_pixels,
+        'is_underexposed': mean_brightness < 120 and dark_pixels > 0.3,
+        'is_overexposed': mean_brightness > 180 and bright_pixels > 0.2,
+        'has_low_contrast': std_brightness < 25, 'has_uneven_lighting': std_brightness > 50
+    }
+
+def analyze_lighting_conditions(image_np):
+    """이미지의 조명 상태를 분석하여 보정 전략을 결정"""
+    lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)
+    l_channel = lab[:, :, 0]
+    mean_brightness = np.mean(l_channel)
+    std_brightness = np.std(l_channel)
+    dark_pixels = np.sum(l_channel < 85) / l_channel.size
+    bright_pixels = np.sum(l_channel > 170) / l_channel.size
+    return _lighting_info(mean_brightness, std_brightness, dark_pixels, bright_pixels)
+
+def l_channel_statistics(l_channel):
+    """analyze_lighting_conditions와 같은 조명 통계를 L 채널 히스토그램 한 번으로 계산"""
+    hist = cv2.calcHist([l_channel], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+    total = hist.sum()
+    levels = np.arange(256, dtype=np.float64)
+    mean_brightness = hist @ levels / total
+    std_brightness = np.sqrt(hist @ (levels - mean_brightness) ** 2 / total)
+    return _lighting_info(mean_brightness, std_brightness, hist[:85].sum() / total, hist[171:].sum() / total)
+
+def select_white_balance_method(lighting_info):
+    """조명 통계에 맞는 화이트 밸런스 방법"""
+    if lighting_info['bright_ratio'] > 0.15:
+        return 'white_patch'
+    if lighting_info['has_uneven_lighting']:
+        return 'illuminant_estimation'
+    return 'gray_world'
+
+def white_balance_correction(image_np, method='gray_world'):
+    """화이트 밸런스 보정"""
+    image = image_np.astype(np.float32) / 255.0
+    if method == 'gray_world':
+        mean_rgb = np.mean(image.reshape(-1, 3), axis=0)
+        scale_factors = 0.5 / (mean_rgb + 1e-8)
+        corrected = image * scale_factors
+    elif method == 'white_patch':
+        max_rgb = np.max(image.reshape(-1, 3), axis=0)
+        scale_factors = 1.0 / (max_rgb + 1e-8)
+        corrected = image * scale_factors
+    else: # illuminant_estimation
+        h, w = image.shape[:2]
+        block_means = [np.mean(image[i:i+h//3, j:j+w//3].reshape(-1, 3), axis=0) for i in range(0, h, h//3) for j in range(0, w, w//3) if image[i:i+h//3, j:j+w//3].size > 0]
+        if block_means:
+            illuminant = np.array(block_means)[np.argmax(np.sum(block_means, axis=1))]
+            scale_factors = 0.9 / (illuminant + 1e-8)
+            corrected = image * scale_factors
+        else:
+            corrected = image
+    return (np.clip(corrected, 0, 1) * 255).astype(np.uint8)
+
+def adaptive_histogram_equalization(image_np, clip_limit=3.0, tile_grid_size=(8, 8)):
+    """적응적 히스토그램 평활화 (CLAHE)"""
+    lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+    lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
+
+def white_balance_lut(image_np, method='gray_world'):
+    """
+    white_balance_correction과 같은 채널별 배율을 (256, 3) LUT로 반환.
+    채널 평균·최댓값은 OpenCV 집계로 계산하므로 배율이 float 오차 범위에서 다를 수 있습니다.
+    """
+    if method == 'gray_world':
+        scale_factors = 0.5 / (np.array(cv2.mean(image_np)[:3]) / 255.0 + 1e-8)
+    elif method == 'white_patch':
+        max_rgb = np.array([cv2.minMaxLoc(image_np[:, :, c])[1] for c in range(3)]) / 255.0
+        scale_factors = 1.0 / (max_rgb + 1e-8)
+    else: # illuminant_estimation
+        h, w = image_np.shape[:2]
+        block_means = [np.array(cv2.mean(image_np[i:i+h//3, j:j+w//3])[:3]) / 255.0
+                       for i in range(0, h, h//3) for j in range(0, w, w//3) if image_np[i:i+h//3, j:j+w//3].size > 0]
+        if block_means:
+            illuminant = np.array(block_means)[np.argmax(np.sum(block_means, axis=1))]
+            scale_factors = 0.9 / (illuminant + 1e-8)
+        else:
+            scale_factors = np.ones(3)
+    levels = np.arange(256, dtype=np.float64)[:, None] / 255.0
+    return (np.clip(levels * scale_factors[None, :], 0, 1) * 255).astype(np.uint8)
+
+@lru_cache(maxsize=TONE_CURVE_CACHE_SIZE)
+def gamma_lut(gamma):
+    """감마 보정용 256 단계 LUT (감마 값별로 캐시)"""
+    inv_gamma = 1.0 / gamma
+    table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in np.arange(0, 256)]).astype("uint8")
+    table.setflags(write=False)
+    return table
+
+def gamma_correction(image_np, gamma=1.0):
+    """감마 보정"""
+    return cv2.LUT(image_np, gamma_lut(gamma))
+
+@lru_cache(maxsize=TONE_CURVE_CACHE_SIZE)
+def shadow_highlight_lut(shadow_amount=0.0, highlight_amount=0.0, shadow_width=50, highlight_width=50):
+    """
+    LAB L 채널 값(0~255)별 그림자/하이라이트 보정 결과 톤 커브.
+    픽셀별 float 연산과 같은 float32 계산을 256개 값에 대해 한 번만 수행하므로 결과가 동일합니다.
+    """
+    l_channel = np.arange(256, dtype=np.float32) / 255.0
+    shadow_mask = np.exp(-((l_channel - 0.0) ** 2) / (2 * (shadow_width / 255.0) ** 2))
+    highlight_mask = np.exp(-((l_channel - 1.0) ** 2) / (2 * (highlight_width / 255.0) ** 2))
+    if shadow_amount != 0.0:
+        l_channel += shadow_amount * shadow_mask * (1.0 - l_channel)
+    if highlight_amount != 0.0:
+        l_channel += highlight_amount * highlight_mask * (l_channel - 1.0)
+    table = (np.clip(l_channel, 0, 1) * 255.0).astype(np.uint8)
+    table.setflags(write=False)
+    return table
+
+def shadow_highlight_correction(image_np, shadow_amount=0.0, highlight_amount=0.0, shadow_width=50, highlight_width=50):
+    """그림자/하이라이트 보정"""
+    lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)
+    lut = shadow_highlight_lut(shadow_amount, highlight_amount, shadow_width, highlight_width)
+    lab[:, :, 0] = cv2.LUT(lab[:, :, 0], lut)
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
+
+def unsharp_masking(image_np, strength=0.5, radius=1.0, threshold=0.0):
+    """언샤프 마스킹을 통한 선명도 향상"""
+    blurred = cv2.GaussianBlur(image_np, (0, 0), radius)
+    mask = image_np.astype(np.float32) - blurred.astype(np.float32)
+    if threshold > 0:
+        mask = np.where(np.abs(mask) < threshold, 0, mask)
+    sharpened = np.clip(image_np.astype(np.float32) + strength * mask, 0, 255).astype(np.uint8)
+    return sharpened
+
+def comprehensive_lighting_correction(image_np, lighting_info=None):
+    """종합적인 조명 보정 파이프라인"""
+    if lighting_info is None:
+        lighting_info = analyze_lighting_conditions(image_np)
+    
+    corrected = image_np.copy()
+    correction_log = []
+    
+    wb_method = select_white_balance_method(lighting_info)
+    corrected = white_balance_correction(corrected, method=wb_method)
+    correction_log.append(f"White balance: {wb_method}")
+    
+    if lighting_info['is_underexposed']:
+        corrected = shadow_highlight_correction(corrected, shadow_amount=0.3, highlight_amount=-0.1)
+        corrected = gamma_correction(corrected, 0.7)
+        correction_log.append("Underexposure correction: shadow lift + gamma 0.7")
+    elif lighting_info['is_overexposed']:
+        corrected = shadow_highlight_correction(corrected, shadow_amount=0.0, highlight_amount=-0.4)
+        corrected = gamma_correction(corrected, 1.3)
+        correction_log.append("Overexposure correction: highlight recovery + gamma 1.3")
+    
+    if lighting_info['has_low_contrast']:
+        clip_limit = 4.0 if lighting_info['std_brightness'] < 15 else 2.5
+        corrected = adaptive_histogram_equalization(corrected, clip_limit=clip_limit)
+        correction_log.append(f"Low contrast correction: CLAHE (clip_limit={clip_limit})")
+    elif lighting_info['has_uneven_lighting']:
+        corrected = adaptive_histogram_equalization(corrected, clip_limit=2.0, tile_grid_size=(6, 6))
+        correction_log.append("Uneven lighting correction: Soft CLAHE")
+    
+    if lighting_info['std_brightness'] < 30:
+        corrected = unsharp_masking(corrected, strength=0.3, radius=1.2)
+        correction_log.append("Sharpening applied")
+        
+    return corrected, correction_log
+
+def lab_lighting_correction(image_np, lighting_info=None):
+    """
+    comprehensive_lighting_correction과 같은 판단으로 보정하되, 화이트 밸런스는 채널별 LUT로 한 번에 적용하고
+    노출·대비·선명도 보정은 LAB 변환 한 번 뒤 L 채널에서만 수행하는 빠른 파이프라인.
+    감마와 언샤프 마스킹도 L 채널에 적용하므로 결과가 기존 파이프라인과 조금 다릅니다.
+    """
+    if lighting_info is None:
+        lighting_info = l_channel_statistics(cv2.cvtColor(image_np, cv2.COLOR_RGB2LAB)[:, :, 0])
+    correction_log = []
+
+    wb_method = select_white_balance_method(lighting_info)
+    corrected = cv2.LUT(image_np, white_balance_lut(image_np, wb_method).reshape(1, 256, 3))
+    correction_log.append(f"White balance: {wb_method}")
+
+    # L 채널 톤 커브 (그림자/하이라이트 + 감마를 하나의 LUT로 합성)
+    tone_curve = None
+    if lighting_info['is_underexposed']:
+        tone_curve = gamma_lut(0.7)[shadow_highlight_lut(0.3, -0.1)]
+        correction_log.append("Underexposure correction: shadow lift + gamma 0.7")
+    elif lighting_info['is_overexposed']:
+        tone_curve = gamma_lut(1.3)[shadow_highlight_lut(0.0, -0.4)]
+        correction_log.append("Overexposure correction: highlight recovery + gamma 1.3")
+
+    clahe = None
+    if lighting_info['has_low_contrast']:
+        clip_limit = 4.0 if lighting_info['std_brightness'] < 15 else 2.5
+        clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8))
+        correction_log.append(f"Low contrast correction: CLAHE (clip_limit={clip_limit})")
+    elif lighting_info['has_uneven_lighting']:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(6, 6))
+        correction_log.append("Uneven lighting correction: Soft CLAHE")
+
+    sharpen = lighting_info['std_brightness'] < 30
+    if sharpen:
+        correction_log.append("Sharpening applied")
+
+    if tone_curve is None and clahe is None and not sharpen:
+        return corrected, correction_log
+
+    l_channel, a_channel, b_channel = cv2.split(cv2.cvtColor(corrected, cv2.COLOR_RGB2LAB))
+    if tone_curve is not None:
+        l_channel = cv2.LUT(l_channel, tone_curve)
+    if clahe is not None:
+        l_channel = clahe.apply(l_channel)
+    if sharpen:
+        blurred = cv2.GaussianBlur(l_channel, (0, 0), 1.2)
+        l_channel = cv2.addWeighted(l_channel, 1.3, blurred, -0.3, 0)
+    return cv2.cvtColor(cv2.merge([l_channel, a_channel, b_channel]), cv2.COLOR_LAB2RGB), correction_log
+
+
+def prepare_analysis_image(image, apply_correction=True, is_camera_input=False, resolution='full',
+                           pipeline='reference', timer=None):
+    """
+    업로드 이미지(PIL RGB)를 facer 분석용 ANALYSIS_SIZE RGB 배열로 만들고 (배열, 보정 로그)를 반환.
+    resolution='analysis'이면 (원본이 분석 크기보다 클 때) 축소를 먼저 하고, 양방향 필터 지름도 축소 비율에 맞춰 줄입니다.
+    pipeline은 LIGHTING_PIPELINES 중 조명 보정 구현을 선택합니다.
+    timer(stage)가 주어지면 각 단계를 with 블록으로 감싸 시간을 기록합니다.
+    """
+    if resolution not in LIGHTING_RESOLUTIONS:
+        raise ValueError(f"Unknown lighting resolution: {resolution}")
+    if pipeline not in LIGHTING_PIPELINES:
+        raise ValueError(f"Unknown lighting pipeline: {pipeline}")
+    correct = lab_lighting_correction if pipeline == 'lab' else comprehensive_lighting_correction
+    timer = timer or (lambda stage: nullcontext())
+
+    diameter = BILATERAL_DIAMETER
+    scale = min(ANALYSIS_SIZE[0] / image.width, ANALYSIS_SIZE[1] / image.height)
+    # 분석 크기보다 작은 이미지는 확대하기 전 원본 크기에서 보정하는 편이 더 빠름
+    if resolution == 'analysis' and scale < 1.0:
+        diameter = max(int(round(BILATERAL_DIAMETER * scale)), 3)
+        image = image.resize(ANALYSIS_SIZE)
+
+    image_np = np.array(image)
+    correction_log = []
+    if apply_correction:
+        # 카메라 입력의 경우 노이즈 감소를 위해 양방향 필터 적용
+        if is_camera_input:
+            with timer('bilateral_filter'):
+                image_np = cv2.bilateralFilter(image_np, d=diameter, sigmaColor=75, sigmaSpace=75)
+        with timer('lighting_correction'):
+            image_np, correction_log = correct(image_np)
+        image = Image.fromarray(image_np)
+
+    if image.size != ANALYSIS_SIZE:
+        image = image.resize(ANALYSIS_SIZE)
+    return np.array(image), correction_log
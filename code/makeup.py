@@ -1,12 +1,71 @@
 import cv2
 import os
+from functools import lru_cache
+
 import numpy as np
 from skimage.filters import gaussian
 
 
-def sharpen(img):
+# skimage's gaussian truncates its kernel at 4 sigma, so each sharpened pixel
+# only depends on pixels within SHARPEN_RADIUS of it.
+SHARPEN_SIGMA = 5
+SHARPEN_RADIUS = int(4.0 * SHARPEN_SIGMA + 0.5)
+
+SHARPEN_MODES = ('exact', 'fast', 'approx')
+# 'exact' reproduces the original output; 'fast'/'approx' are opt-in
+# (SHARPEN_MODE=fast), compare them with benchmark.py first.
+SHARPEN_MODE = os.getenv('SHARPEN_MODE', 'exact')
+
+DEFAULT_INTENSITY = 0.75
+
+BLEND_MODES = ('soft_light', 'multiply', 'overlay', 'color')
+# Palettes and colors.json hold a finite set of colors, so a small cache
+# keeps every (color, mode, intensity) table in use.
+LUT_CACHE_SIZE = 512
+
+
+def sharpen(img, mode=None):
+    """
+    Unsharp masking used for hair (sigma 5, amount 1.5).
+    'mode' selects the implementation (default SHARPEN_MODE):
+      'exact'  - float64 skimage gaussian, the reference output.
+      'fast'   - float32 OpenCV separable gaussian with the same kernel and
+                 border; at most 1 level off the reference. The mean error
+                 depends on the photo (~0.001 on the example JPEGs, ~0.5 on
+                 han_nwae_nyein.png, where many pixels round the other way).
+      'approx' - blur at half resolution and upsample; mean error 0.1-0.2
+                 level, 99.9% of pixels within 2 levels, max 9 on the bundled
+                 photos.
+    """
+    mode = mode or SHARPEN_MODE
+    if mode == 'exact':
+        return _sharpen_exact(img)
+    if mode not in SHARPEN_MODES:
+        raise ValueError(f"Unknown sharpen mode: {mode}")
+
+    alpha = 1.5
+    img_float = img.astype(np.float32)
+    ksize = 2 * SHARPEN_RADIUS + 1
+    if mode == 'fast':
+        gauss_out = cv2.GaussianBlur(img_float, (ksize, ksize), SHARPEN_SIGMA,
+                                     borderType=cv2.BORDER_REPLICATE)
+    else:
+        h, w = img.shape[:2]
+        small = cv2.resize(img_float, (max(w // 2, 1), max(h // 2, 1)), interpolation=cv2.INTER_AREA)
+        sigma = SHARPEN_SIGMA / 2.0
+        small_ksize = 2 * int(4.0 * sigma + 0.5) + 1
+        small = cv2.GaussianBlur(small, (small_ksize, small_ksize), sigma,
+                                 borderType=cv2.BORDER_REPLICATE)
+        gauss_out = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+    # (img - gauss_out) * alpha + img, truncated to uint8 like the reference
+    img_out = cv2.addWeighted(img_float, 1 + alpha, gauss_out, -alpha, 0)
+    return np.clip(img_out, 0, 255).astype(np.uint8)
+
+
+def _sharpen_exact(img):
     img = img * 1.0
-    gauss_out = gaussian(img, sigma=5, channel_axis=-1)
+    gauss_out = gaussian(img, sigma=SHARPEN_SIGMA, channel_axis=-1)
 
     alpha = 1.5
     img_out = (img - gauss_out) * alpha + img
@@ -42,46 +101,165 @@ def soft_light_blend(base, blend_color_img):
     return np.clip(result_float * 255, 0, 255).astype(np.uint8)
 
 
-def hair(image, parsing, part=17, color=[230, 50, 20], intensity=0.75):
+def _blend_float(base_float, blend_float, mode):
+    """Separable blend modes on 0-1 float arrays."""
+    if mode == 'multiply':
+        return base_float * blend_float
+    if mode == 'overlay':
+        return np.where(base_float < 0.5,
+                        2 * base_float * blend_float,
+                        1 - 2 * (1 - base_float) * (1 - blend_float))
+    raise ValueError(f"Unknown blend mode: {mode}")
+
+
+def _color_blend_table(color):
     """
-    Applies color to a specific part of the image using soft light blending with adjustable intensity.
-    'image' is expected in BGR format.
-    'color' is a list [b, g, r].
-    'intensity' is a float between 0.0 and 1.0.
+    'color' mode keeps the base luminance and takes hue and saturation from
+    the blend color (W3C SetLum/ClipColor). The result only depends on the
+    base luminance, so the table is indexed by 8-bit luma instead of channel value.
+    """
+    # Rec.601 luma weights in BGR order, matching cv2.COLOR_BGR2GRAY
+    weights = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+    blend = np.asarray(color, dtype=np.float32) / 255.0
+    lum = np.arange(256, dtype=np.float32)[:, None] / 255.0
+
+    out = blend[None, :] + (lum - blend @ weights)
+    out_lum = out @ weights
+    lo = out.min(axis=1)
+    hi = out.max(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low_fix = out_lum[:, None] + (out - out_lum[:, None]) * out_lum[:, None] / (out_lum - lo)[:, None]
+        high_fix = out_lum[:, None] + (out - out_lum[:, None]) * (1 - out_lum[:, None]) / (hi - out_lum)[:, None]
+    out = np.where((lo < 0)[:, None], low_fix, out)
+    out = np.where((hi > 1)[:, None], high_fix, out)
+    out = np.nan_to_num(out, nan=0.0)
+    return (np.clip(out, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+
+@lru_cache(maxsize=LUT_CACHE_SIZE)
+def blend_lut(color, mode='soft_light', intensity=None):
+    """
+    Returns a read-only (256, 3) uint8 lookup table for blending a constant
+    [b, g, r] color in the given mode. For the separable modes row v holds the
+    result for base value v per channel, with the intensity mix folded in when
+    'intensity' is given. For 'color' mode rows are indexed by base luma and
+    intensity is applied separately.
+    """
+    base = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    if mode == 'color':
+        lut = _color_blend_table(color)
+    else:
+        tar_color_img = np.zeros_like(base)
+        tar_color_img[:] = color
+        if mode == 'soft_light':
+            lut = soft_light_blend(base, tar_color_img)
+        else:
+            result_float = _blend_float(base.astype(np.float32) / 255.0,
+                                        tar_color_img.astype(np.float32) / 255.0, mode)
+            lut = np.clip(result_float * 255, 0, 255).astype(np.uint8)
+        if intensity is not None:
+            lut = cv2.addWeighted(lut, intensity, base, 1 - intensity, 0)
+    lut.setflags(write=False)
+    return lut
+
+
+def apply_blend(pixels, color, mode='soft_light', intensity=None):
     """
-    b, g, r = color
-    # Create a solid color image with the target color
-    tar_color_img = np.zeros_like(image)
-    tar_color_img[:, :] = (b, g, r)
+    Blends a constant [b, g, r] color into BGR 'pixels' (an image or an
+    (N, 3) pixel array) with a cached lookup table.
+    If 'intensity' is given, the result is mixed with the input like
+    cv2.addWeighted(blended, intensity, pixels, 1 - intensity, 0).
+    """
+    if mode not in BLEND_MODES:
+        raise ValueError(f"Unknown blend mode: {mode}")
+    color = tuple(int(c) for c in color)
+    if intensity is not None:
+        intensity = float(np.clip(intensity, 0.0, 1.0))
+
+    src = pixels.reshape(-1, 1, 3)
+    if mode == 'color':
+        luma = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY).ravel()
+        out = blend_lut(color, mode)[luma]
+        if intensity is not None:
+            out = cv2.addWeighted(out, intensity, pixels.reshape(-1, 3), 1 - intensity, 0)
+    else:
+        lut = blend_lut(color, mode, intensity)
+        out = cv2.LUT(src, lut.reshape(1, 256, 3))
+    return out.reshape(pixels.shape)
 
-    # Blend the original image with the solid color image
-    blended_image = soft_light_blend(image, tar_color_img)
 
-    # Apply sharpening for hair
-    if part == 17:
-        blended_image = sharpen(blended_image)
+def part_pixel_index(parsing, parts):
+    """
+    Returns {part: flat pixel indices} for the requested parts, built from a
+    single pass over the label map.
+    """
+    parts = sorted(set(parts))
+    selected = np.zeros(256, dtype=bool)
+    selected[parts] = True
+
+    flat = parsing.ravel()
+    idx = np.flatnonzero(selected[flat])
+    labels = flat[idx]
+    order = np.argsort(labels, kind='stable')
+    idx, labels = idx[order], labels[order]
 
-    # Create a copy of the original image to modify
+    bounds = np.searchsorted(labels, parts + [256])
+    return {part: idx[bounds[i]:bounds[i + 1]] for i, part in enumerate(parts)}
+
+
+def apply_makeup(image, parsing, spec):
+    """
+    Colors several parts of the image in one pass.
+    'image' is expected in BGR format.
+    'spec' maps a part id to (color, intensity) or (color, intensity, mode),
+    with color as [b, g, r] and mode one of BLEND_MODES (default soft light).
+    Every part is blended from the input image and written into a single
+    output buffer, so the result matches chaining hair() calls with hair first.
+    """
     changed = image.copy()
-    
-    # Extract the pixels for the original and the makeup version
-    original_pixels = image[parsing == part]
-    makeup_pixels = blended_image[parsing == part]
-
-    if len(original_pixels) > 0:
-        # Ensure intensity is within a valid range [0.0, 1.0]
-        safe_intensity = np.clip(intensity, 0.0, 1.0)
-        
-        # Blend the makeup pixels with the original pixels based on intensity
-        # dst = src1*alpha + src2*beta + gamma
-        blended_pixels = cv2.addWeighted(makeup_pixels, safe_intensity, original_pixels, 1 - safe_intensity, 0)
-        
-        # Apply the result back to the image
-        changed[parsing == part] = blended_pixels
-    
+    if not spec:
+        return changed
+
+    h, w = parsing.shape
+    src_pixels = image.reshape(-1, 3)
+    out_pixels = changed.reshape(-1, 3)
+
+    for part, pix in part_pixel_index(parsing, spec.keys()).items():
+        if len(pix) == 0:
+            continue
+        color, intensity, *rest = spec[part]
+        mode = rest[0] if rest else 'soft_light'
+        original_pixels = src_pixels[pix]
+
+        if part == 17:
+            # Hair is sharpened, which needs the neighbourhood of every pixel
+            rows, cols = pix // w, pix % w
+            y0, y1 = max(rows.min() - SHARPEN_RADIUS, 0), min(rows.max() + 1 + SHARPEN_RADIUS, h)
+            x0, x1 = max(cols.min() - SHARPEN_RADIUS, 0), min(cols.max() + 1 + SHARPEN_RADIUS, w)
+            blended_image = sharpen(apply_blend(image[y0:y1, x0:x1], color, mode))
+            makeup_pixels = blended_image[rows - y0, cols - x0]
+
+            # Blend the makeup pixels with the original pixels based on intensity
+            # dst = src1*alpha + src2*beta + gamma
+            safe_intensity = np.clip(intensity, 0.0, 1.0)
+            out_pixels[pix] = cv2.addWeighted(makeup_pixels, safe_intensity, original_pixels, 1 - safe_intensity, 0)
+        else:
+            # Blend and intensity mix are folded into one lookup table
+            out_pixels[pix] = apply_blend(original_pixels, color, mode, intensity)
+
     return changed
 
 
+def hair(image, parsing, part=17, color=[230, 50, 20], intensity=DEFAULT_INTENSITY):
+    """
+    Applies color to a specific part of the image using soft light blending with adjustable intensity.
+    'image' is expected in BGR format.
+    'color' is a list [b, g, r].
+    'intensity' is a float between 0.0 and 1.0.
+    """
+    return apply_makeup(image, parsing, {part: (color, intensity)})
+
+
 if __name__ == '__main__':
     # 1  face
     # 10 nose
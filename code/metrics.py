@@ -0,0 +1,106 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# 단계별 지연 시간 히스토그램 버킷 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 현재 요청의 엔드포인트 이름 (요청 스레드 및 작업 워커에서 사용)
+_current_endpoint = contextvars.ContextVar('metrics_endpoint', default='background')
+
+
+def set_endpoint(endpoint):
+    """이후 기록되는 단계 시간의 endpoint 라벨을 설정"""
+    _current_endpoint.set(endpoint)
+
+
+def _format_labels(labels):
+    return ','.join(f'{k}="{str(v)}"' for k, v in labels)
+
+
+class MetricsRegistry:
+    """
+    엔드포인트·단계별 지연 시간 히스토그램과 대기열/추론 중 게이지를 모아
+    Prometheus 텍스트 형식으로 내보내는 간단한 레지스트리.
+    """
+
+    def __init__(self, prefix='beautiai', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._in_flight = {}
+        self._queue_gauges = {}
+
+    def observe(self, stage, seconds, endpoint=None):
+        """단계 하나의 소요 시간(초)을 기록"""
+        key = (endpoint or _current_endpoint.get(), stage)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist['counts'][i] += 1
+            hist['sum'] += seconds
+            hist['count'] += 1
+
+    @contextmanager
+    def timed(self, stage, endpoint=None):
+        """with 블록의 실행 시간을 stage 단계로 기록"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, endpoint=endpoint)
+
+    @contextmanager
+    def in_flight(self, model):
+        """with 블록 동안 해당 모델의 추론 중 게이지를 1 증가"""
+        with self._lock:
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[model] -= 1
+
+    def register_queue(self, name, size_fn):
+        """대기열 길이를 반환하는 함수를 queue 게이지로 등록"""
+        self._queue_gauges[name] = size_fn
+
+    def render(self):
+        """Prometheus 텍스트 노출 형식(0.0.4)으로 모든 지표를 반환"""
+        p = self.prefix
+        lines = [
+            f'# HELP {p}_stage_seconds Latency of each pipeline stage per endpoint.',
+            f'# TYPE {p}_stage_seconds histogram',
+        ]
+        with self._lock:
+            histograms = {key: {'counts': list(h['counts']), 'sum': h['sum'], 'count': h['count']}
+                          for key, h in self._histograms.items()}
+            in_flight = dict(self._in_flight)
+
+        for (endpoint, stage), hist in sorted(histograms.items()):
+            labels = [('endpoint', endpoint), ('stage', stage)]
+            for bound, count in zip(self.buckets, hist['counts']):
+                lines.append(f'{p}_stage_seconds_bucket{{{_format_labels(labels + [("le", bound)])}}} {count}')
+            lines.append(f'{p}_stage_seconds_bucket{{{_format_labels(labels + [("le", "+Inf")])}}} {hist["count"]}')
+            lines.append(f'{p}_stage_seconds_sum{{{_format_labels(labels)}}} {hist["sum"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{{_format_labels(labels)}}} {hist["count"]}')
+
+        lines += [
+            f'# HELP {p}_queue_depth Requests waiting in each queue.',
+            f'# TYPE {p}_queue_depth gauge',
+        ]
+        for name, size_fn in sorted(self._queue_gauges.items()):
+            lines.append(f'{p}_queue_depth{{queue="{name}"}} {size_fn()}')
+
+        lines += [
+            f'# HELP {p}_model_in_flight Inference calls currently running per model.',
+            f'# TYPE {p}_model_in_flight gauge',
+        ]
+        for model, count in sorted(in_flight.items()):
+            lines.append(f'{p}_model_in_flight{{model="{model}"}} {count}')
+        return '\n'.join(lines) + '\n'
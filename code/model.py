@@ -2,6 +2,8 @@
 # -*- encoding: utf-8 -*-
 
 
+import inspect
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -75,7 +77,7 @@ class AttentionRefinementModule(nn.Module):
 
     def forward(self, x):
         feat = self.conv(x)
-        atten = F.avg_pool2d(feat, feat.size()[2:])
+        atten = F.adaptive_avg_pool2d(feat, 1)
         atten = self.conv_atten(atten)
         atten = self.bn_atten(atten)
         atten = self.sigmoid_atten(atten)
@@ -90,9 +92,9 @@ class AttentionRefinementModule(nn.Module):
 
 
 class ContextPath(nn.Module):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, pretrained=True, *args, **kwargs):
         super(ContextPath, self).__init__()
-        self.resnet = Resnet18()
+        self.resnet = Resnet18(pretrained=pretrained)
         self.arm16 = AttentionRefinementModule(256, 128)
         self.arm32 = AttentionRefinementModule(512, 128)
         self.conv_head32 = ConvBNReLU(128, 128, ks=3, stride=1, padding=1)
@@ -108,7 +110,7 @@ class ContextPath(nn.Module):
         H16, W16 = feat16.size()[2:]
         H32, W32 = feat32.size()[2:]
 
-        avg = F.avg_pool2d(feat32, feat32.size()[2:])
+        avg = F.adaptive_avg_pool2d(feat32, 1)
         avg = self.conv_avg(avg)
         avg_up = F.interpolate(avg, (H32, W32), mode='nearest')
 
@@ -200,7 +202,7 @@ class FeatureFusionModule(nn.Module):
     def forward(self, fsp, fcp):
         fcat = torch.cat([fsp, fcp], dim=1)
         feat = self.convblk(fcat)
-        atten = F.avg_pool2d(feat, feat.size()[2:])
+        atten = F.adaptive_avg_pool2d(feat, 1)
         atten = self.conv1(atten)
         atten = self.relu(atten)
         atten = self.conv2(atten)
@@ -227,15 +229,22 @@ class FeatureFusionModule(nn.Module):
         return wd_params, nowd_params
 
 
+# Part names of the 19-class face parsing checkpoint (79999_iter.pth), by label id
+BISENET_LABELS = ('background', 'skin', 'l_brow', 'r_brow', 'l_eye', 'r_eye', 'eye_g', 'l_ear', 'r_ear', 'ear_r',
+                  'nose', 'mouth', 'u_lip', 'l_lip', 'neck', 'neck_l', 'cloth', 'hair', 'hat')
+
+
 class BiSeNet(nn.Module):
-    def __init__(self, n_classes, *args, **kwargs):
+    def __init__(self, n_classes, pretrained=True, *args, **kwargs):
         super(BiSeNet, self).__init__()
-        self.cp = ContextPath()
+        self.cp = ContextPath(pretrained=pretrained)
         ## here self.sp is deleted
         self.ffm = FeatureFusionModule(256, 256)
         self.conv_out = BiSeNetOutput(256, 256, n_classes)
         self.conv_out16 = BiSeNetOutput(128, 64, n_classes)
         self.conv_out32 = BiSeNetOutput(128, 64, n_classes)
+        # memory format parse() converts its input to; see to_channels_last()
+        self.input_memory_format = torch.contiguous_format
         self.init_weight()
 
     def forward(self, x):
@@ -253,6 +262,30 @@ class BiSeNet(nn.Module):
         feat_out32 = F.interpolate(feat_out32, (H, W), mode='bilinear', align_corners=True)
         return feat_out, feat_out16, feat_out32
 
+    def parse(self, x):
+        """
+        Inference-only path: returns the (N, H, W) uint8 label map of the main head.
+        The auxiliary conv_out16/conv_out32 heads are skipped, and only the
+        main logits are upsampled before the argmax, so labels match
+        forward(x)[0].argmax(1).
+        """
+        H, W = x.size()[2:]
+        x = x.contiguous(memory_format=self.input_memory_format)
+        feat_res8, feat_cp8, _ = self.cp(x)
+        feat_fuse = self.ffm(feat_res8, feat_cp8)
+        feat_out = self.conv_out(feat_fuse)
+        feat_out = F.interpolate(feat_out, (H, W), mode='bilinear', align_corners=True)
+        return feat_out.argmax(dim=1).to(torch.uint8)
+
+    def to_channels_last(self):
+        """
+        Switches the weights and the parse() input to channels_last (NHWC),
+        which the oneDNN CPU convolutions run without layout reorders.
+        """
+        self.to(memory_format=torch.channels_last)
+        self.input_memory_format = torch.channels_last
+        return self
+
     def init_weight(self):
         for ly in self.children():
             if isinstance(ly, nn.Conv2d):
@@ -272,6 +305,69 @@ class BiSeNet(nn.Module):
         return wd_params, nowd_params, lr_mul_wd_params, lr_mul_nowd_params
 
 
+def _conv_bn_pairs(net):
+    """
+    (parent, conv_name, bn_name) for every BatchNorm2d registered right after
+    the Conv2d that feeds it (ConvBNReLU, BasicBlock, downsample, ARM, stem).
+    """
+    pairs = []
+    for parent in net.modules():
+        children = list(parent.named_children())
+        for (conv_name, conv), (bn_name, bn) in zip(children, children[1:]):
+            if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+                pairs.append((parent, conv_name, bn_name))
+    return pairs
+
+
+def fold_batchnorm(net):
+    """
+    Folds every eval-mode BatchNorm2d into the preceding convolution's weight
+    and bias and replaces the BatchNorm with Identity.
+    """
+    from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+    net.eval()
+    for parent, conv_name, bn_name in _conv_bn_pairs(net):
+        fused = fuse_conv_bn_eval(getattr(parent, conv_name), getattr(parent, bn_name))
+        setattr(parent, conv_name, fused)
+        setattr(parent, bn_name, nn.Identity())
+    return net
+
+
+def _strip_batchnorm(net):
+    """Gives net the structure of fold_batchnorm()'s output so folded weights can be loaded."""
+    for parent, conv_name, bn_name in _conv_bn_pairs(net):
+        conv = getattr(parent, conv_name)
+        if conv.bias is None:
+            conv.bias = nn.Parameter(torch.empty(conv.out_channels, device=conv.weight.device,
+                                                 dtype=conv.weight.dtype))
+        setattr(parent, bn_name, nn.Identity())
+    return net
+
+
+def load_inference_model(checkpoint_path, n_classes=19, map_location='cpu', folded=False):
+    """
+    Builds BiSeNet for inference straight from a full checkpoint.
+    The ImageNet backbone download is skipped, and on torch >= 2.1 the model
+    is built on the meta device so no random init runs before the load.
+    folded=True loads a state dict saved after fold_batchnorm().
+    """
+    state_dict = torch.load(checkpoint_path, map_location=map_location)
+    if 'assign' in inspect.signature(nn.Module.load_state_dict).parameters:
+        with torch.device('meta'):
+            net = BiSeNet(n_classes=n_classes, pretrained=False)
+            if folded:
+                _strip_batchnorm(net)
+        net.load_state_dict(state_dict, assign=True)
+    else:
+        net = BiSeNet(n_classes=n_classes, pretrained=False)
+        if folded:
+            _strip_batchnorm(net)
+        net.load_state_dict(state_dict)
+    net.eval()
+    return net
+
+
 if __name__ == "__main__":
     net = BiSeNet(19)
     net.cuda()
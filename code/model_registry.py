@@ -0,0 +1,94 @@
+import threading
+import time
+import traceback
+
+# 모델별 로드 상태 (pending: 시작 전, loading: 로드 중, ready: 사용 가능, failed: 실패)
+MODEL_STATES = ('pending', 'loading', 'ready', 'failed')
+
+
+class ModelRegistry:
+    """
+    이름별 모델 로더를 모델마다 백그라운드 스레드에서 동시에 실행하고 상태와 로드 시간을 보관하는 레지스트리.
+    로더는 인자 없이 호출되어 모델을 준비하며, 라우트는 wait(names)로 자기에게 필요한 모델만 기다립니다.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._cond = threading.Condition()
+
+    def register(self, name, loader):
+        """모델 이름과 로더 함수를 등록"""
+        with self._cond:
+            self._loaders[name] = loader
+            self._models[name] = {'state': 'pending', 'seconds': None, 'error': None, 'started': None}
+
+    def start(self, names=None):
+        """아직 시작하지 않은 모델(names가 없으면 전체)의 로드 스레드를 시작하고 시작한 이름 목록을 반환"""
+        with self._cond:
+            names = [name for name in (names or self._loaders) if self._models[name]['state'] == 'pending']
+            for name in names:
+                self._models[name].update(state='loading', started=time.perf_counter())
+        for name in names:
+            threading.Thread(target=self._load, args=(name,), name=f'load-{name}', daemon=True).start()
+        return names
+
+    def _load(self, name):
+        try:
+            self._loaders[name]()
+            state, error = 'ready', None
+        except Exception as e:
+            print(f"❌ Failed to load model '{name}': {e}")
+            traceback.print_exc()
+            state, error = 'failed', f"{type(e).__name__}: {e}"
+        with self._cond:
+            model = self._models[name]
+            model.update(state=state, error=error, seconds=time.perf_counter() - model['started'])
+            self._cond.notify_all()
+
+    def wait(self, names=None, timeout=None):
+        """
+        names 모델(없으면 전체)이 모두 준비되면 True.
+        하나라도 실패했거나 로드를 시작하지 않았거나 timeout 초 안에 준비되지 않으면 False
+        """
+        names = list(self._loaders if names is None else names)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                states = [self._models[name]['state'] for name in names]
+                if all(state == 'ready' for state in states):
+                    return True
+                if 'failed' in states or 'pending' in states:
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    def ready(self, names=None):
+        """기다리지 않고 names 모델이 모두 준비되었는지 확인"""
+        return self.wait(names, timeout=0)
+
+    def join(self, timeout=None):
+        """로드 중인 모델이 모두 끝날 때까지(성공 또는 실패) 기다리고, 전부 준비되었으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(model['state'] == 'loading' for model in self._models.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return all(model['state'] == 'ready' for model in self._models.values())
+
+    def status(self):
+        """모델별 상태, 로드 시간(초, 로드 중이면 경과 시간), 실패 사유"""
+        now = time.perf_counter()
+        with self._cond:
+            status = {}
+            for name, model in self._models.items():
+                seconds = model['seconds']
+                if model['state'] == 'loading':
+                    seconds = now - model['started']
+                status[name] = {'state': model['state'], 'error': model['error'],
+                                'seconds': None if seconds is None else round(seconds, 3)}
+            return status
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+
+# facer FaRL celebm 라벨 -> BiSeNet 파트 번호
+#   FaRL:   0 background, 1 neck, 2 face, 3 cloth, 4 rr, 5 lr, 6 rb, 7 lb, 8 re, 9 le,
+#           10 nose, 11 imouth, 12 llip, 13 ulip, 14 hair, 15 eyeg, 16 hat, 17 earr, 18 neck_l
+FARL_TO_BISENET = np.array([0, 14, 1, 16, 8, 7, 3, 2, 5, 4, 10, 11, 13, 12, 17, 6, 18, 9, 15], dtype=np.uint8)
+
+
+def farl_to_bisenet(seg_map):
+    """facer FaRL 분할 맵을 makeup.hair()가 쓰는 BiSeNet 파트 번호의 uint8 라벨 맵으로 변환"""
+    return FARL_TO_BISENET[seg_map]
+
+
+def content_hash(data):
+    """업로드 파일 내용(bytes)의 SHA-1 해시를 캐시 키로 반환"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def resize_parsing(parsing, shape):
+    """파싱 결과(라벨 맵)를 원본 이미지 크기 (h, w)로 최근접 보간 리사이즈"""
+    h, w = shape
+    return np.array(Image.fromarray(parsing.astype(np.uint8)).resize((w, h), Image.NEAREST))
+
+
+class ParsingCache:
+    """
+    얼굴 파싱 마스크 캐시.
+    메모리에는 원본 크기 라벨 맵을 바이트 예산 내에서 LRU로 보관하고,
+    디스크에는 파싱 해상도(512x512 등)의 압축 사본을 저장해 재시작 후에도 재사용합니다.
+    디스크 사본도 max_disk_bytes를 넘으면 마지막 사용 시각(mtime)이 오래된 것부터 삭제합니다.
+    반환하는 라벨 맵은 캐시와 공유하는 읽기 전용 배열이므로, 수정하려면 복사해서 사용하세요.
+    /analyze의 facer 분할 결과처럼 바로 쓰지 않는 라벨 맵은 put_compact/get_compact로 디스크에만 보관합니다.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, max_disk_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = None  # 첫 저장 때 디렉터리를 훑어 계산
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_files(self):
+        """디스크 캐시 파일의 (mtime, 크기, 경로) 목록"""
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith('.npz'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _account_disk(self, nbytes):
+        """저장한 바이트를 더하고 디스크 예산을 넘으면 오래된 파일부터 예산의 90%까지 삭제"""
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += nbytes
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            # 다른 워커 프로세스도 같은 디렉터리에 쓰므로 실제 파일 목록으로 다시 계산
+            files = sorted(self._disk_files())
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_disk_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._disk_bytes = total
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _remember(self, key, parsing):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            if parsing.nbytes > self.max_bytes:
+                return
+            # 호출자가 캐시된 배열을 제자리 수정하지 못하도록 읽기 전용으로 보관
+            parsing.setflags(write=False)
+            self._entries[key] = parsing
+            self._bytes += parsing.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def get(self, key, shape):
+        """캐시된 원본 크기 라벨 맵을 반환 (없으면 None)"""
+        with self._lock:
+            parsing = self._entries.get(key)
+            if parsing is not None and parsing.shape == tuple(shape):
+                self._entries.move_to_end(key)
+                return parsing
+
+        compact = self.get_compact(key)
+        if compact is None:
+            return None
+        parsing = resize_parsing(compact, shape)
+        self._remember(key, parsing)
+        return parsing
+
+    def has_compact(self, key):
+        """디스크에 key의 라벨 맵이 있는지 확인"""
+        return os.path.exists(self._disk_path(key))
+
+    def get_compact(self, key):
+        """디스크에 저장된 파싱 해상도 라벨 맵을 반환 (없으면 None)"""
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                compact = data['parsing']
+        except (OSError, ValueError, KeyError):
+            # 손상된 캐시 파일은 무시하고 다시 계산하도록 함
+            return None
+        try:
+            # 디스크 사본의 mtime을 마지막 사용 시각으로 갱신 (디스크 예산 초과 시 삭제 순서)
+            os.utime(path)
+        except OSError:
+            pass
+        return compact
+
+    def put_compact(self, key, compact):
+        """파싱 해상도의 라벨 맵을 디스크에만 저장"""
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, parsing=compact.astype(np.uint8))
+            os.replace(tmp_path, path)
+            self._account_disk(os.path.getsize(path))
+        except OSError as e:
+            print(f"Parsing cache write failed for {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put(self, key, compact, shape):
+        """파싱 해상도의 라벨 맵을 저장하고 원본 크기 라벨 맵을 반환"""
+        self.put_compact(key, compact)
+        parsing = resize_parsing(compact, shape)
+        self._remember(key, parsing)
+        return parsing
+
+    def clear(self):
+        """메모리 캐시를 비움 (디스크 사본은 유지)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,183 @@
+"""
+가상 메이크업용 BiSeNet int8 정적 양자화 도구.
+
+로컬 얼굴 이미지 폴더로 FX 그래프 모드 정적 후학습 양자화(PTQ)를 보정(calibrate)해
+체크포인트 옆에 79999_iter.int8.ts.pt로 저장하고 (BISENET_BACKEND=int8),
+검증 이미지에서 fp32 eager 라벨 대비 파트별 마스크 IoU와 속도를 보고합니다.
+
+    python quantize_bisenet.py calibrate --images ~/faces/calib --max-images 200
+    python quantize_bisenet.py report --images ~/faces/val --output validation/int8_iou.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+from bisenet_backends import (DEFAULT_CHECKPOINT, DEFAULT_IMAGES, EXPORT_SIZE, _ParseModule, _atomic_write,
+                              exported_path, load_bisenet, load_parse_inputs)
+from model import BISENET_LABELS, load_inference_model
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp')
+# 가상 메이크업에서 파싱하는 크기 (기본 512, PARSE_REGION=face의 저해상도 전체 사진 256)
+CALIBRATION_SIZES = (512, 256)
+
+
+def default_engine():
+    """이 CPU에서 쓸 수 있는 양자화 엔진 (x86/fbgemm 우선, ARM 등은 qnnpack)"""
+    engines = torch.backends.quantized.supported_engines
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in engines:
+            return engine
+    raise RuntimeError("This PyTorch build has no quantized CPU engine")
+
+
+def image_patterns(paths):
+    """폴더는 그 안의 이미지 파일 패턴으로, 나머지는 glob 패턴 그대로 반환"""
+    patterns = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            patterns.extend(os.path.join(path, f'*.{ext}') for ext in IMAGE_EXTENSIONS)
+        else:
+            patterns.append(path)
+    return patterns
+
+
+def quantize_parse_model(net, calibration_inputs, engine=None):
+    """
+    BiSeNet parse 경로를 FX 정적 int8 양자화하고 추적(trace)한 TorchScript 모듈을 반환.
+    calibration_inputs는 app.to_tensor와 같이 정규화된 (1, 3, H, W) 텐서 목록입니다.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = engine or default_engine()
+    torch.backends.quantized.engine = engine
+    example = calibration_inputs[0]
+    prepared = prepare_fx(_ParseModule(net).eval(), get_default_qconfig_mapping(engine), (example,))
+    with torch.inference_mode():
+        for x in calibration_inputs:
+            prepared(x)
+    quantized = convert_fx(prepared)
+    with torch.inference_mode():
+        traced = torch.jit.trace(quantized, torch.zeros(1, 3, EXPORT_SIZE, EXPORT_SIZE), check_trace=False)
+        traced = torch.jit.freeze(traced)
+    return traced
+
+
+def save_quantized(traced, path, engine):
+    """양자화 모델을 사용한 엔진 이름과 함께 저장 (TorchScriptBiSeNet이 로드 전에 같은 엔진을 선택)"""
+    _atomic_write(path, lambda tmp_path: torch.jit.save(traced, tmp_path,
+                                                        _extra_files={'quantized_engine': engine}))
+    return path
+
+
+def calibrate_command(args):
+    net = load_inference_model(args.checkpoint)
+    inputs = load_parse_inputs(image_patterns(args.images or DEFAULT_IMAGES), args.sizes)
+    if not inputs:
+        print("No calibration images found.")
+        return 1
+    # 이미지 하나의 여러 크기가 함께 들어가도록 이미지 단위로 자름
+    inputs = inputs[:args.max_images * len(args.sizes)]
+    engine = args.engine or default_engine()
+
+    start = time.perf_counter()
+    traced = quantize_parse_model(net, [x for _, _, x in inputs], engine=engine)
+    path = save_quantized(traced, exported_path(args.checkpoint, 'int8'), engine)
+    print(f"Calibrated on {len(inputs) // len(args.sizes)} images ({engine}) -> {path} "
+          f"({time.perf_counter() - start:.1f} s)")
+    return 0
+
+
+def class_iou(expected, labels, n_classes=len(BISENET_LABELS)):
+    """파트별 교집합·합집합 픽셀 수 (n_classes,) 두 배열"""
+    intersection = np.bincount(expected[expected == labels].ravel(), minlength=n_classes)[:n_classes]
+    union = (np.bincount(expected.ravel(), minlength=n_classes)[:n_classes] +
+             np.bincount(labels.ravel(), minlength=n_classes)[:n_classes] - intersection)
+    return intersection, union
+
+
+def report_command(args):
+    """fp32 eager 라벨을 기준으로 int8 모델의 파트별 마스크 IoU와 parse 시간을 비교"""
+    reference = load_inference_model(args.checkpoint)
+    quantized = load_bisenet(args.checkpoint, 'int8')
+    inputs = load_parse_inputs(image_patterns(args.images or DEFAULT_IMAGES), args.sizes)
+    if not inputs:
+        print("No validation images found.")
+        return 1
+
+    n_classes = len(BISENET_LABELS)
+    intersection, union = np.zeros(n_classes, dtype=np.int64), np.zeros(n_classes, dtype=np.int64)
+    timings = {'fp32': [], 'int8': []}
+    agreements = []
+    with torch.inference_mode():
+        for path, size, x in inputs:
+            start = time.perf_counter()
+            expected = reference.parse(x).cpu().numpy()
+            timings['fp32'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            labels = quantized.parse(x).cpu().numpy()
+            timings['int8'].append(time.perf_counter() - start)
+            inter, uni = class_iou(expected, labels, n_classes)
+            intersection += inter
+            union += uni
+            agreements.append(float(np.mean(labels == expected)))
+
+    per_class = {name: (float(intersection[i] / union[i]) if union[i] else None)
+                 for i, name in enumerate(BISENET_LABELS)}
+    present = [iou for iou in per_class.values() if iou is not None]
+    summary = {
+        'inputs': len(inputs), 'mean_iou': float(np.mean(present)), 'pixel_agreement': float(np.mean(agreements)),
+        'fp32_seconds_mean': float(np.mean(timings['fp32'])), 'int8_seconds_mean': float(np.mean(timings['int8'])),
+    }
+    summary['speedup'] = summary['fp32_seconds_mean'] / summary['int8_seconds_mean']
+
+    for name, iou in per_class.items():
+        print(f"{name:<12} {'-' if iou is None else f'{iou * 100:6.2f}%':>8}")
+    print(f"Mean IoU {summary['mean_iou'] * 100:.2f}%, pixel agreement {summary['pixel_agreement'] * 100:.2f}% "
+          f"over {len(inputs)} inputs (parse {summary['fp32_seconds_mean'] * 1000:.1f} -> "
+          f"{summary['int8_seconds_mean'] * 1000:.1f} ms, {summary['speedup']:.1f}x)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'per_class_iou': per_class}, f, indent=2)
+    return 0 if args.min_miou is None or summary['mean_iou'] >= args.min_miou else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calibrate an int8 BiSeNet and report its accuracy cost')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    calibrate_parser = sub.add_parser('calibrate', help='static int8 PTQ calibrated on a folder of face images')
+    calibrate_parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    calibrate_parser.add_argument('--images', nargs='*', help='image folders or glob patterns (default: bundled images)')
+    calibrate_parser.add_argument('--max-images', type=int, default=200)
+    calibrate_parser.add_argument('--sizes', nargs='+', type=int, default=list(CALIBRATION_SIZES))
+    calibrate_parser.add_argument('--engine', choices=torch.backends.quantized.supported_engines, default=None)
+    calibrate_parser.set_defaults(func=calibrate_command)
+
+    report_parser = sub.add_parser('report', help='per-class mask IoU of int8 against fp32 on validation images')
+    report_parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    report_parser.add_argument('--images', nargs='*', help='image folders or glob patterns (default: bundled images)')
+    report_parser.add_argument('--sizes', nargs='+', type=int, default=[512])
+    report_parser.add_argument('--output', default=None, help='write the report to this JSON file')
+    report_parser.add_argument('--min-miou', type=float, default=None, help='exit 1 below this mean IoU')
+    report_parser.set_defaults(func=report_command)
+
+    args = parser.parse_args(argv)
+    if args.images:
+        # 사용자가 지정한 이미지 폴더는 실행한 위치 기준
+        args.images = [os.path.abspath(os.path.expanduser(p)) for p in args.images]
+    # 번들 리소스의 상대 경로(res/, static/, uploads/) 기준으로 실행
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
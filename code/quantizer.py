@@ -0,0 +1,128 @@
+import numpy as np
+
+# 피부 대표색 추출 방식
+#   'sklearn' - 요청마다 sklearn KMeans(n_init='auto', random_state=42) 학습 (기존 동작)
+#   'fast'    - 같은 k-means++ 시드에서 Lab 색 히스토그램에 대해 벡터화된 Lloyd 반복
+SKIN_QUANTIZERS = ('sklearn', 'fast')
+
+QUANTIZER_SEED = 42
+QUANTIZER_MAX_ITER = 100
+QUANTIZER_TOL = 1e-4
+
+
+def _squared_distances(centers, X64, XX, dtype):
+    """centers와 점들 사이 제곱 거리 (sklearn과 같이 float64로 계산한 뒤 dtype으로 변환)"""
+    centers64 = centers.astype(np.float64)
+    d = -2 * (centers64 @ X64.T)
+    d += np.einsum('ij,ij->i', centers64, centers64)[:, None]
+    d += XX[None, :]
+    return np.maximum(d.astype(dtype), 0)
+
+
+def kmeans_plusplus_indices(X, n_clusters, random_state=QUANTIZER_SEED, inverse=None):
+    """
+    sklearn KMeans(random_state=...)와 같은 난수 순서로 greedy k-means++ 초기 중심을 고르고
+    원래 점 순서의 인덱스를 반환. X는 sklearn처럼 평균을 뺀 float32 배열이어야 합니다.
+    inverse(원래 점 -> X의 고유 점 인덱스)가 주어지면 거리는 고유 점에서만 계산해 원래 순서로 펼칩니다.
+    """
+    rng = np.random.RandomState(random_state)
+    n_samples = X.shape[0] if inverse is None else inverse.shape[0]
+    X64 = X.astype(np.float64)
+    XX = np.einsum('ij,ij->i', X64, X64)
+
+    def distances(ids):
+        rows = ids if inverse is None else inverse[ids]
+        d = _squared_distances(X[rows], X64, XX, X.dtype)
+        # 이후 float32 합계가 sklearn과 같도록 C 연속 배열로 펼침
+        return d if inverse is None else d.take(inverse, axis=1)
+
+    sample_weight = np.ones(n_samples, dtype=X.dtype)
+    n_local_trials = 2 + int(np.log(n_clusters))
+
+    indices = np.full(n_clusters, -1, dtype=int)
+    indices[0] = rng.choice(n_samples, p=sample_weight / sample_weight.sum())
+    closest_dist_sq = distances(indices[:1])
+    current_pot = closest_dist_sq @ sample_weight
+
+    for c in range(1, n_clusters):
+        rand_vals = rng.uniform(size=n_local_trials) * current_pot
+        candidate_ids = np.searchsorted(np.cumsum(sample_weight * closest_dist_sq), rand_vals)
+        np.clip(candidate_ids, None, closest_dist_sq.size - 1, out=candidate_ids)
+
+        distance_to_candidates = distances(candidate_ids)
+        np.minimum(closest_dist_sq, distance_to_candidates, out=distance_to_candidates)
+        candidates_pot = distance_to_candidates @ sample_weight.reshape(-1, 1)
+
+        best = np.argmin(candidates_pot)
+        current_pot = candidates_pot[best]
+        closest_dist_sq = distance_to_candidates[best]
+        indices[c] = candidate_ids[best]
+    return indices
+
+
+def weighted_lloyd(points, weights, centers, max_iter=QUANTIZER_MAX_ITER, tol=0.0):
+    """
+    가중치가 있는 점들에 대한 벡터화된 Lloyd 반복 (float32).
+    라벨이 바뀌지 않거나 중심 이동 제곱합이 tol 이하이면 종료합니다 (sklearn과 같은 기준).
+    """
+    points = points.astype(np.float32)
+    weighted = (points * weights[:, None]).ravel()
+    centers = centers.astype(np.float32)
+    n_clusters, n_features = centers.shape
+    offsets = np.arange(n_features)
+    labels_old = None
+    for _ in range(max_iter):
+        d = np.einsum('ij,ij->i', centers, centers)[None, :] - 2 * (points @ centers.T)
+        labels = np.argmin(d, axis=1)
+
+        weight_in_clusters = np.bincount(labels, weights=weights, minlength=n_clusters)
+        sums = np.bincount((labels[:, None] * n_features + offsets).ravel(), weights=weighted,
+                           minlength=n_clusters * n_features).reshape(n_clusters, n_features)
+        # 빈 클러스터는 이전 중심을 유지
+        nonempty = weight_in_clusters > 0
+        centers_new = centers.copy()
+        centers_new[nonempty] = sums[nonempty] / weight_in_clusters[nonempty, None]
+
+        shift = ((centers_new - centers) ** 2).sum()
+        centers = centers_new
+        if labels_old is not None and np.array_equal(labels, labels_old):
+            break
+        if shift <= tol:
+            break
+        labels_old = labels
+    return centers
+
+
+def quantize_skin_colors(pixels, n_colors=7, random_state=QUANTIZER_SEED, max_iter=QUANTIZER_MAX_ITER):
+    """
+    피부 Lab 픽셀 (N, 3) uint8의 대표색 n_colors개를 float32 (n_colors, 3)로 반환.
+    초기 중심은 sklearn KMeans(random_state=42)와 같은 k-means++ 선택이라 중심 순서가 같고
+    (kmeans_model이 이 순서의 특징으로 학습됨), Lloyd 반복은 픽셀 대신 고유 색 히스토그램
+    (고유 색, 픽셀 수)에서 수행합니다.
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    X = pixels.astype(np.float32)
+    X_mean = X.mean(axis=0)
+
+    keys = (pixels[:, 0].astype(np.int32) << 16) | (pixels[:, 1].astype(np.int32) << 8) | pixels[:, 2]
+    keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    colors = np.stack([keys >> 16, (keys >> 8) & 0xFF, keys & 0xFF], axis=1).astype(np.float32) - X_mean
+
+    inverse = inverse.ravel()
+    seeds = colors[inverse[kmeans_plusplus_indices(colors, n_colors, random_state, inverse=inverse)]]
+    tol = np.mean(np.var(X, axis=0)) * QUANTIZER_TOL
+    centers = weighted_lloyd(colors, counts.astype(np.float64), seeds, max_iter=max_iter, tol=tol)
+    return (centers + X_mean).astype(np.float32)
+
+
+def skin_color_centers(skin_pixels, n_colors=7, method='sklearn'):
+    """피부 대표색 중심 (n_colors, 3) float32를 method(SKIN_QUANTIZERS) 방식으로 계산"""
+    if method == 'fast':
+        return quantize_skin_colors(skin_pixels, n_colors)
+    if method != 'sklearn':
+        raise ValueError(f"Unknown skin quantizer: {method}")
+
+    from sklearn.cluster import KMeans
+    kmeans = KMeans(n_clusters=n_colors, n_init='auto', random_state=QUANTIZER_SEED)
+    kmeans.fit(skin_pixels.astype(np.float32))
+    return kmeans.cluster_centers_.astype(np.float32)
@@ -0,0 +1,98 @@
+import math
+import os
+
+# 스레드 수를 맞출 BLAS/OpenMP 환경 변수 (이후 로드되는 라이브러리와 자식 프로세스용)
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                   'VECLIB_MAXIMUM_THREADS')
+
+_budget = None
+
+
+def available_cpus():
+    """이 프로세스가 쓸 수 있는 CPU 수 (CPU 친화도와 cgroup v2 cpu.max 할당량 반영)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def thread_budget(cpus, workers=1, inference_concurrency=2, request_concurrency=2):
+    """
+    코어 수를 서버 워커 프로세스와 프로세스 안의 동시 작업 수로 나눠 라이브러리별 스레드 수를 정함.
+    inference_concurrency는 동시에 도는 torch 추론 수(facer·BiSeNet 배치 스케줄러),
+    request_concurrency는 동시에 OpenCV/NumPy 전처리를 하는 요청 수(분석 작업 워커)입니다.
+    """
+    per_worker = max(1, cpus // max(1, workers))
+    cpu_threads = max(1, per_worker // max(1, request_concurrency))
+    return {
+        'cpus': cpus, 'workers': workers, 'cpus_per_worker': per_worker,
+        'inference_concurrency': inference_concurrency, 'request_concurrency': request_concurrency,
+        'torch_intra_op': max(1, per_worker // max(1, inference_concurrency)),
+        # 요청 간 병렬성은 배치 스케줄러와 작업 워커가 담당하므로 연산자 간 병렬화는 쓰지 않음
+        'torch_inter_op': 1,
+        'opencv': cpu_threads,
+        'blas': cpu_threads,
+    }
+
+
+def apply_thread_budget(budget):
+    """torch, OpenCV, BLAS/OpenMP 스레드 풀에 budget을 적용하고 적용된 값을 반환"""
+    global _budget
+    import cv2
+    import torch
+
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(budget['blas'])
+    torch.set_num_threads(budget['torch_intra_op'])
+    try:
+        torch.set_num_interop_threads(budget['torch_inter_op'])
+    except RuntimeError:
+        # 연산자 간 스레드 풀이 이미 시작된 경우 (포크된 워커 등) 변경할 수 없음
+        pass
+    cv2.setNumThreads(budget['opencv'])
+    try:
+        from threadpoolctl import threadpool_limits
+        # 이미 로드된 BLAS/OpenMP 라이브러리에 프로세스 전체로 적용
+        threadpool_limits(limits=budget['blas'])
+    except ImportError:
+        pass
+    _budget = dict(budget)
+    return runtime_info()
+
+
+def runtime_info():
+    """설정한 스레드 예산과 각 라이브러리의 실제 스레드 수"""
+    import cv2
+    import torch
+
+    info = {
+        'budget': _budget,
+        'torch': {'intra_op': torch.get_num_threads(), 'inter_op': torch.get_num_interop_threads()},
+        'opencv': cv2.getNumThreads(),
+        'env': {var: os.environ.get(var) for var in THREAD_ENV_VARS},
+    }
+    try:
+        from threadpoolctl import threadpool_info
+        info['threadpools'] = [{'library': pool.get('internal_api'), 'api': pool.get('user_api'),
+                                'num_threads': pool.get('num_threads')} for pool in threadpool_info()]
+    except ImportError:
+        info['threadpools'] = []
+    return info
+
+
+def format_runtime_info(info):
+    """시작 로그용 한 줄 요약"""
+    pools = {f"{pool['library']}={pool['num_threads']}": None for pool in info['threadpools']}
+    pools = ', '.join(pools)
+    budget = info['budget'] or {}
+    return (f"{budget.get('cpus')} CPUs / {budget.get('workers')} worker(s): torch intra-op "
+            f"{info['torch']['intra_op']}, inter-op {info['torch']['inter_op']}, OpenCV {info['opencv']}"
+            f"{', ' + pools if pools else ''}")
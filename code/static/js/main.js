@@ -81,32 +81,35 @@ async function startAnalysis() {
     }
     showPage('loading');
 
-    // 로딩 단계 애니메이션 (step1~step4 순차 활성화)
+    // 로딩 단계 표시 초기화
     const steps = ['step1', 'step2', 'step3', 'step4'];
-    let currentStep = 0;
-    const progressInterval = setInterval(() => {
-        if (currentStep < steps.length) {
-            const stepEl = document.getElementById(steps[currentStep]);
-            if(stepEl) stepEl.classList.add('active');
-            currentStep++;
-        } else {
-            clearInterval(progressInterval);
-        }
-    }, 800);
+    steps.forEach(id => {
+        const stepEl = document.getElementById(id);
+        if (stepEl) stepEl.classList.remove('active');
+    });
 
     const formData = new FormData();
     formData.append('file', fileForAnalysis);
 
     try {
-        const response = await fetch('/analyze', {
+        // 분석 작업 제출 후 서버가 알려주는 실제 단계에 맞춰 진행 표시
+        const response = await fetch('/analyze_jobs', {
             method: 'POST',
             body: formData
         });
-        const data = await response.json();
+        const job = await response.json();
         if (!response.ok) {
-            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            throw new Error(job.error || `HTTP error! status: ${response.status}`);
         }
 
+        const data = await waitForAnalysisJob(job, stage => {
+            const activeCount = ANALYSIS_STAGE_STEPS[stage] || 0;
+            steps.slice(0, activeCount).forEach(id => {
+                const stepEl = document.getElementById(id);
+                if (stepEl) stepEl.classList.add('active');
+            });
+        });
+
         document.querySelector('#result .result-info h2').textContent = `${data.visual_name} ✨`;
         document.querySelector('#result .result-info p').textContent = data.type_description;
 
@@ -123,17 +126,67 @@ async function startAnalysis() {
         analyzedClusterId = data.cluster_id;
         uploadedFilename = data.uploaded_image_url.split('/').pop();
         
-        clearInterval(progressInterval); // Clear interval on success
         showPage('result');
 
     } catch (error) {
-        clearInterval(progressInterval); // Clear interval on error
         console.error('Analysis failed:', error);
         showNotification(error.message || '분석에 실패했습니다. 다시 시도해주세요.', 'error');
         showPage('upload');
     }
 }
 
+// 서버 분석 단계 → 활성화할 로딩 단계 수
+const ANALYSIS_STAGE_STEPS = {
+    decode: 0, correct: 1, detect: 1, parse: 2, cluster: 2, classify: 3, done: 4
+};
+
+/**
+ * 분석 작업이 끝날 때까지 진행 상황을 구독하고 결과를 반환합니다.
+ * server-sent events를 우선 사용하고, 연결이 끊기면 상태 조회(폴링)로 전환합니다.
+ */
+function waitForAnalysisJob(job, onStage) {
+    return new Promise((resolve, reject) => {
+        const finish = status => {
+            onStage(status.status === 'done' ? 'done' : status.stage);
+            if (status.status === 'done') {
+                resolve(status.result);
+            } else {
+                reject(new Error((status.result && status.result.error) || '분석에 실패했습니다.'));
+            }
+        };
+
+        const poll = async () => {
+            try {
+                const response = await fetch(job.status_url);
+                const status = await response.json();
+                if (!response.ok) throw new Error(status.error || `HTTP error! status: ${response.status}`);
+                if (status.status === 'done' || status.status === 'failed') return finish(status);
+                onStage(status.stage);
+                setTimeout(poll, 700);
+            } catch (error) {
+                reject(error);
+            }
+        };
+
+        if (!window.EventSource) return poll();
+
+        const events = new EventSource(job.events_url);
+        events.onmessage = event => {
+            const status = JSON.parse(event.data);
+            if (status.status === 'done' || status.status === 'failed') {
+                events.close();
+                finish(status);
+            } else {
+                onStage(status.stage);
+            }
+        };
+        events.onerror = () => {
+            events.close();
+            poll();
+        };
+    });
+}
+
 /******************************************************
  * 웹캠 관련
  ******************************************************/
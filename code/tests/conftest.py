@@ -0,0 +1,7 @@
+import os
+import sys
+
+# code/ 의 평면 모듈(parsing_cache, batching 등)을 테스트에서 바로 import
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if CODE_DIR not in sys.path:
+    sys.path.insert(0, CODE_DIR)
@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def test_results_go_back_to_their_callers():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(10)]
+
+
+def test_result_count_mismatch_fails_the_whole_batch():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='returned'):
+            future.result(timeout=5)
+
+
+def test_process_batch_errors_reach_every_caller():
+    def fail(items):
+        raise ValueError('model failed')
+
+    batcher = MicroBatcher(fail, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match='model failed'):
+            future.result(timeout=5)
+    # 실패 후에도 워커는 다음 배치를 계속 처리
+    batcher.process_batch = lambda items: items
+    assert batcher(7) == 7
+
+
+def test_call_times_out():
+    release = threading.Event()
+
+    def slow(items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(slow, result_timeout=0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher(1)
+    finally:
+        release.set()
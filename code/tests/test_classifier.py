@@ -0,0 +1,46 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from classifier import PersonalColorClassifier
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def models():
+    scaler = joblib.load(os.path.join(CODE_DIR, 'scaler.joblib'))
+    kmeans_model = joblib.load(os.path.join(CODE_DIR, 'kmeans_model.joblib'))
+    return scaler, kmeans_model, PersonalColorClassifier.from_sklearn(scaler, kmeans_model)
+
+
+@pytest.fixture(scope='module')
+def features(models):
+    # 앱의 대표색처럼 학습 분포를 따르는 float32 특징
+    scaler, _, classifier = models
+    rng = np.random.default_rng(0)
+    return scaler.inverse_transform(rng.normal(size=(20000, classifier.n_features))).astype(np.float32)
+
+
+def test_transform_matches_scaler(models, features):
+    scaler, _, classifier = models
+    np.testing.assert_allclose(classifier.transform(features), scaler.transform(features), atol=1e-5)
+
+
+def test_labels_and_distances_match_sklearn(models, features):
+    scaler, kmeans_model, classifier = models
+    scaled = scaler.transform(features)
+    labels, distances = classifier.predict(features, return_distances=True)
+
+    # 근사 분류기이므로 경계 위의 점은 다를 수 있지만 학습 분포에서는 거의 모두 같아야 함
+    assert np.mean(labels != kmeans_model.predict(scaled)) < 1e-3
+    np.testing.assert_allclose(distances, kmeans_model.transform(scaled), atol=1e-3)
+
+
+def test_single_row(models, features):
+    _, _, classifier = models
+    assert classifier.predict(features[0]).shape == (1,)
+    with pytest.raises(ValueError):
+        classifier.predict(features[:, :-1])
@@ -0,0 +1,60 @@
+import numpy as np
+
+from face_roi import compact_box, compose_parsing, crop_area_ratio, face_crop_box, fill_background
+
+
+def test_face_crop_box_is_square_and_inside():
+    shape = (800, 600)
+    for rect in ((250, 300, 350, 420), (0, 0, 120, 150), (500, 700, 600, 800), (0, 0, 600, 800)):
+        left, top, right, bottom = face_crop_box(rect, shape)
+        assert right - left == bottom - top
+        assert 0 <= left < right <= shape[1] and 0 <= top < bottom <= shape[0]
+
+
+def test_crop_paste_round_trip():
+    shape = (800, 600)
+    box = face_crop_box((250, 300, 350, 420), shape)
+    left, top, right, bottom = box
+    assert crop_area_ratio(box, shape) < 1
+
+    coarse = np.full((128, 96), 16, dtype=np.uint8)
+    # 실제 파싱처럼 영역 단위로 뭉친 라벨
+    fine = np.kron(np.random.default_rng(0).integers(0, 19, size=(16, 16), dtype=np.uint8),
+                   np.ones((32, 32), dtype=np.uint8))
+    parsing = compose_parsing(coarse, fine, box, shape)
+
+    assert parsing.shape == shape
+    # 붙여 넣은 영역을 다시 파싱 해상도로 줄이면 원래 얼굴 라벨 맵과 대부분 같음
+    crop = np.array(parsing[top:bottom, left:right])
+    restored = compose_parsing(np.zeros((1, 1), np.uint8), crop, (0, 0, 512, 512), (512, 512))
+    assert np.mean(restored == fine) > 0.9
+    outside = np.ones(shape, dtype=bool)
+    outside[top:bottom, left:right] = False
+    assert np.all(parsing[outside] == 16)
+
+
+def test_compact_box_scales_to_parsing_size():
+    shape = (4000, 3000)
+    box = face_crop_box((1200, 1500, 1800, 2300), shape)
+    (ch, cw), (left, top, right, bottom) = compact_box(box, shape)
+
+    assert abs((right - left) - 512) <= 1
+    assert abs(ch / cw - shape[0] / shape[1]) < 0.01
+    assert 0 <= left < right <= cw and 0 <= top < bottom <= ch
+
+
+def test_compact_box_never_upscales():
+    shape = (300, 200)
+    box = (10, 20, 110, 120)
+    assert compact_box(box, shape) == (shape, box)
+
+
+def test_fill_background_keeps_face_labels():
+    face = np.zeros((64, 64), dtype=np.uint8)
+    face[16:48, 16:48] = 1
+    coarse = np.full((16, 16), 16, dtype=np.uint8)
+    filled = fill_background(face, coarse)
+
+    assert filled.dtype == np.uint8
+    assert np.all(filled[16:48, 16:48] == 1)
+    assert np.all(filled[:16] == 16)
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from parsing_cache import ParsingCache
+
+
+def label_map(seed, size=64):
+    return np.random.default_rng(seed).integers(0, 19, size=(size, size), dtype=np.uint8)
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = ParsingCache(str(tmp_path))
+    compact = label_map(0)
+    parsing = cache.put('a.full.eager', compact, (128, 96))
+
+    assert parsing.shape == (128, 96)
+    assert cache.get('a.full.eager', (128, 96)) is parsing
+    np.testing.assert_array_equal(cache.get_compact('a.full.eager'), compact)
+
+    # 메모리 캐시를 비워도 디스크 사본에서 같은 결과를 복원
+    cache.clear()
+    np.testing.assert_array_equal(cache.get('a.full.eager', (128, 96)), parsing)
+
+
+def test_returned_maps_are_read_only(tmp_path):
+    cache = ParsingCache(str(tmp_path))
+    parsing = cache.put('a', label_map(0), (64, 64))
+    with pytest.raises(ValueError):
+        parsing[0, 0] = 1
+    with pytest.raises(ValueError):
+        cache.get('a', (64, 64))[0, 0] = 1
+
+
+def test_keys_are_distinct(tmp_path):
+    cache = ParsingCache(str(tmp_path))
+    cache.put('a.full.eager', label_map(0), (64, 64))
+    cache.put('a.face.eager', label_map(1), (64, 64))
+
+    assert cache.get('a.full.onnx', (64, 64)) is None
+    assert not cache.has_compact('a.full.onnx')
+    assert not np.array_equal(cache.get('a.full.eager', (64, 64)), cache.get('a.face.eager', (64, 64)))
+
+
+def test_compact_entries_stay_on_disk_only(tmp_path):
+    cache = ParsingCache(str(tmp_path))
+    assert cache.get_compact('a.farl') is None
+    cache.put_compact('a.farl', label_map(0))
+    assert cache.has_compact('a.farl')
+    assert cache._bytes == 0
+
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = ParsingCache(str(tmp_path))
+    with open(os.path.join(tmp_path, 'a.npz'), 'wb') as f:
+        f.write(b'not a zip file')
+    assert cache.get_compact('a') is None
+    assert cache.get('a', (64, 64)) is None
+
+
+def test_memory_budget_evicts_least_recently_used(tmp_path):
+    cache = ParsingCache(str(tmp_path), max_bytes=2 * 64 * 64)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, label_map(0), (64, 64))
+    assert list(cache._entries) == ['b', 'c']
+    assert cache._bytes <= cache.max_bytes
+
+
+def test_disk_budget_evicts_least_recently_used(tmp_path):
+    compact = label_map(0, size=256)
+    cache = ParsingCache(str(tmp_path), max_disk_bytes=10 ** 9)
+    cache.put_compact('probe', compact)
+    size = os.path.getsize(os.path.join(tmp_path, 'probe.npz'))
+    os.remove(os.path.join(tmp_path, 'probe.npz'))
+
+    cache = ParsingCache(str(tmp_path), max_disk_bytes=int(size * 3.5))
+    for i, key in enumerate(('a', 'b', 'c')):
+        cache.put_compact(key, compact)
+        os.utime(os.path.join(tmp_path, f'{key}.npz'), (1000 + i, 1000 + i))
+    # 읽기는 mtime을 갱신하므로 가장 오래된 'a'가 가장 최근 사용이 됨
+    assert cache.get_compact('a') is not None
+    cache.put_compact('d', compact)
+
+    assert sorted(name for name in os.listdir(tmp_path)) == ['a.npz', 'c.npz', 'd.npz']
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from quantizer import skin_color_centers
+
+
+def skin_pixels(seed, n=20000):
+    """얼굴 피부와 비슷한 분포의 Lab uint8 픽셀"""
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal([170, 140, 150], [12, 5, 6], size=(n, 3)), 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_fast_matches_sklearn_centers(seed):
+    pixels = skin_pixels(seed)
+    expected = skin_color_centers(pixels, 7, method='sklearn')
+    centers = skin_color_centers(pixels, 7, method='fast')
+
+    assert centers.shape == (7, 3) and centers.dtype == np.float32
+    # 같은 k-means++ 시드를 쓰므로 중심 순서까지 같음 (kmeans_model 특징 순서)
+    np.testing.assert_allclose(centers, expected, atol=0.5)
+
+
+def test_fast_is_deterministic():
+    pixels = skin_pixels(0)
+    np.testing.assert_array_equal(skin_color_centers(pixels, 7, method='fast'),
+                                  skin_color_centers(pixels, 7, method='fast'))
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        skin_color_centers(skin_pixels(0, n=100), 7, method='gpu')
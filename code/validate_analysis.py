@@ -0,0 +1,243 @@
+"""
+퍼스널 컬러 분석 경로 검증 도구.
+
+빠른 분석 경로가 기존 경로와 같은 진단 결과(클러스터)를 내는지 번들 이미지와
+조명 변형(어둡게/밝게/저대비/고해상도) 이미지로 비교합니다. facer 모델 가중치가 필요합니다.
+
+    python validate_analysis.py lighting --output validation/lighting.json --min-agreement 0.95
+    python validate_analysis.py lighting --resolution full --pipeline lab
+    python validate_analysis.py quantizer --output validation/quantizer.json
+    python validate_analysis.py classifier --samples 100000
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import joblib
+import numpy as np
+import torch
+from PIL import Image, ImageEnhance
+
+from classifier import PersonalColorClassifier
+from lighting import LIGHTING_PIPELINES, LIGHTING_RESOLUTIONS, prepare_analysis_image
+from quantizer import skin_color_centers
+
+N_REPRESENTATIVE_COLORS = 7
+DEFAULT_IMAGES = [os.path.join('static', 'image', '*.jpg'), os.path.join('static', 'image', '*.png'),
+                  os.path.join('uploads', '*.jpg')]
+
+
+def load_analysis_models(device='cpu'):
+    """app.load_models와 같은 진단 모델을 로드 (Firebase 등 웹앱 설정 없이)"""
+    import facer
+
+    return {
+        'device': device,
+        'detector': facer.face_detector('retinaface/mobilenet', device=device),
+        'parser': facer.face_parser('farl/celebm/448', device=device),
+        'scaler': joblib.load('scaler.joblib'),
+        'kmeans_model': joblib.load('kmeans_model.joblib'),
+    }
+
+
+def detect_and_parse(models, image_np):
+    """분석 크기 RGB 이미지의 분할 맵을 반환 (app.analyze_face_batch와 같은 얼굴 선택, 없으면 None)"""
+    images = torch.from_numpy(image_np).permute(2, 0, 1).unsqueeze(0).to(models['device'])
+    with torch.inference_mode():
+        faces = models['detector'](images)
+        if len(faces['scores']) == 0 or faces['scores'][0] < 0.5:
+            return None
+        faces = {k: faces[k][:1] for k in ('rects', 'points', 'scores', 'image_ids')}
+        faces = models['parser'](images, faces)
+    return faces['seg']['logits'].argmax(dim=1)[0].cpu().numpy()
+
+
+def skin_pixels(image_np, seg_map):
+    """app.extract_facial_part_colors와 같은 피부(얼굴·목) 영역 Lab 픽셀"""
+    image_lab = cv2.cvtColor(image_np, cv2.COLOR_RGB2Lab)
+    return image_lab[np.isin(seg_map, [1, 2])]
+
+
+def skin_features(image_np, seg_map, n_colors=N_REPRESENTATIVE_COLORS, method='sklearn'):
+    """app.extract_facial_part_colors와 같은 피부 Lab 대표색 특징 (피부가 부족하면 None)"""
+    pixels = skin_pixels(image_np, seg_map)
+    if len(pixels) < n_colors:
+        return None
+    return skin_color_centers(pixels, n_colors, method=method).flatten().reshape(1, -1)
+
+
+def predict_cluster(models, features):
+    return int(models['kmeans_model'].predict(models['scaler'].transform(features))[0])
+
+
+def lighting_variants(image):
+    """조명 보정의 각 분기를 거치도록 만든 변형 이미지"""
+    w, h = image.size
+    scale = 4000 / max(w, h)
+    return {
+        'original': image,
+        'dark': ImageEnhance.Brightness(image).enhance(0.4),
+        'bright': ImageEnhance.Brightness(image).enhance(1.6),
+        'low_contrast': ImageEnhance.Contrast(image).enhance(0.4),
+        'high_res': image.resize((int(w * scale), int(h * scale)), Image.BICUBIC),
+    }
+
+
+def collect_images(patterns):
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    return [(p, Image.open(p).convert('RGB')) for p in paths]
+
+
+def validate_lighting(args):
+    """기존 경로(full/reference)와 --resolution/--pipeline 조합의 진단 결과를 비교"""
+    models = load_analysis_models()
+    candidate = {'resolution': args.resolution, 'pipeline': args.pipeline}
+    rows = []
+    for path, image in collect_images(args.images or DEFAULT_IMAGES):
+        for variant, variant_image in lighting_variants(image).items():
+            for is_camera_input in (False, True):
+                row = {'image': path, 'variant': variant, 'camera': is_camera_input}
+                for label, options in (('baseline', {}), ('candidate', candidate)):
+                    start = time.perf_counter()
+                    image_np, _ = prepare_analysis_image(variant_image, is_camera_input=is_camera_input, **options)
+                    row[f'{label}_seconds'] = time.perf_counter() - start
+                    seg_map = detect_and_parse(models, image_np)
+                    features = skin_features(image_np, seg_map) if seg_map is not None else None
+                    row[f'{label}_cluster'] = predict_cluster(models, features) if features is not None else None
+                if row['baseline_cluster'] is None:
+                    # 기존 경로에서도 얼굴을 찾지 못한 경우는 비교에서 제외
+                    continue
+                row['agree'] = row['baseline_cluster'] == row['candidate_cluster']
+                rows.append(row)
+                print(f"{os.path.basename(path):<40} {variant:<13} camera={int(is_camera_input)} "
+                      f"baseline={row['baseline_cluster']} candidate={row['candidate_cluster']} "
+                      f"{row['baseline_seconds'] * 1000:8.1f} -> {row['candidate_seconds'] * 1000:7.1f} ms"
+                      f"{'' if row['agree'] else '  MISMATCH'}")
+
+    if not rows:
+        print("No faces detected in the validation images.")
+        return 1
+    agreement = sum(row['agree'] for row in rows) / len(rows)
+    summary = {
+        'candidate': candidate, 'cases': len(rows), 'agreement': agreement,
+        'baseline_seconds_mean': float(np.mean([row['baseline_seconds'] for row in rows])),
+        'candidate_seconds_mean': float(np.mean([row['candidate_seconds'] for row in rows])),
+    }
+    print(f"Cluster agreement: {agreement * 100:.1f}% over {len(rows)} cases "
+          f"(preprocessing {summary['baseline_seconds_mean'] * 1000:.1f} -> {summary['candidate_seconds_mean'] * 1000:.1f} ms)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'cases': rows}, f, indent=2)
+    return 0 if agreement >= args.min_agreement else 1
+
+
+def validate_quantizer(args):
+    """sklearn KMeans와 빠른 양자화기의 대표색 및 진단 결과를 비교"""
+    models = load_analysis_models()
+    rows = []
+    for path, image in collect_images(args.images or DEFAULT_IMAGES):
+        for variant, variant_image in lighting_variants(image).items():
+            image_np, _ = prepare_analysis_image(variant_image, resolution='analysis')
+            seg_map = detect_and_parse(models, image_np)
+            if seg_map is None:
+                continue
+            pixels = skin_pixels(image_np, seg_map)
+            if len(pixels) < N_REPRESENTATIVE_COLORS:
+                continue
+            row = {'image': path, 'variant': variant, 'skin_pixels': int(len(pixels))}
+            centers = {}
+            for method in ('sklearn', 'fast'):
+                start = time.perf_counter()
+                centers[method] = skin_color_centers(pixels, N_REPRESENTATIVE_COLORS, method=method)
+                row[f'{method}_seconds'] = time.perf_counter() - start
+                row[f'{method}_cluster'] = predict_cluster(models, centers[method].reshape(1, -1))
+            row['max_center_diff'] = float(np.abs(centers['sklearn'] - centers['fast']).max())
+            row['agree'] = row['sklearn_cluster'] == row['fast_cluster']
+            rows.append(row)
+            print(f"{os.path.basename(path):<40} {variant:<13} sklearn={row['sklearn_cluster']} fast={row['fast_cluster']} "
+                  f"max diff {row['max_center_diff']:5.2f}  "
+                  f"{row['sklearn_seconds'] * 1000:7.1f} -> {row['fast_seconds'] * 1000:6.1f} ms"
+                  f"{'' if row['agree'] else '  MISMATCH'}")
+
+    if not rows:
+        print("No faces detected in the validation images.")
+        return 1
+    agreement = sum(row['agree'] for row in rows) / len(rows)
+    summary = {
+        'cases': len(rows), 'agreement': agreement,
+        'max_center_diff': max(row['max_center_diff'] for row in rows),
+        'sklearn_seconds_mean': float(np.mean([row['sklearn_seconds'] for row in rows])),
+        'fast_seconds_mean': float(np.mean([row['fast_seconds'] for row in rows])),
+    }
+    print(f"Cluster agreement: {agreement * 100:.1f}% over {len(rows)} cases, max centroid difference "
+          f"{summary['max_center_diff']:.2f} (kmeans {summary['sklearn_seconds_mean'] * 1000:.1f} -> "
+          f"{summary['fast_seconds_mean'] * 1000:.1f} ms)")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'cases': rows}, f, indent=2)
+    return 0 if agreement >= args.min_agreement else 1
+
+
+def validate_classifier(args):
+    """NumPy 분류기의 라벨·거리를 sklearn scaler + kmeans_model과 비교 (facer 불필요)"""
+    scaler = joblib.load('scaler.joblib')
+    kmeans_model = joblib.load('kmeans_model.joblib')
+    classifier = PersonalColorClassifier.from_sklearn(scaler, kmeans_model)
+
+    # 학습 분포를 따르는 특징을 앱의 대표색과 같은 float32로 생성
+    rng = np.random.default_rng(args.seed)
+    features = scaler.inverse_transform(rng.normal(size=(args.samples, classifier.n_features))).astype(np.float32)
+
+    start = time.perf_counter()
+    expected = kmeans_model.predict(scaler.transform(features))
+    sklearn_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    labels, distances = classifier.predict(features, return_distances=True)
+    numpy_seconds = time.perf_counter() - start
+
+    mismatches = int(np.count_nonzero(labels != expected))
+    distance_error = float(np.abs(distances - kmeans_model.transform(scaler.transform(features))).max())
+    print(f"Label mismatches: {mismatches} of {args.samples}, max distance difference {distance_error:.2e} "
+          f"({sklearn_seconds * 1000:.1f} -> {numpy_seconds * 1000:.1f} ms)")
+    return 0 if mismatches == 0 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check that fast analysis paths keep the personal color result')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    lighting_parser = sub.add_parser('lighting', help='compare a lighting configuration against full/reference')
+    lighting_parser.add_argument('--resolution', choices=LIGHTING_RESOLUTIONS, default='analysis')
+    lighting_parser.add_argument('--pipeline', choices=LIGHTING_PIPELINES, default='reference')
+    lighting_parser.add_argument('--images', nargs='*', help='image glob patterns (default: bundled images)')
+    lighting_parser.add_argument('--output', default=None, help='write per-case results to this JSON file')
+    lighting_parser.add_argument('--min-agreement', type=float, default=0.95)
+    lighting_parser.set_defaults(func=validate_lighting)
+
+    quantizer_parser = sub.add_parser('quantizer', help="compare SKIN_QUANTIZER 'fast' against sklearn KMeans")
+    quantizer_parser.add_argument('--images', nargs='*', help='image glob patterns (default: bundled images)')
+    quantizer_parser.add_argument('--output', default=None, help='write per-case results to this JSON file')
+    quantizer_parser.add_argument('--min-agreement', type=float, default=0.99)
+    quantizer_parser.set_defaults(func=validate_quantizer)
+
+    classifier_parser = sub.add_parser('classifier', help='compare the approximate NumPy classifier against sklearn')
+    classifier_parser.add_argument('--samples', type=int, default=100000)
+    classifier_parser.add_argument('--seed', type=int, default=0)
+    classifier_parser.set_defaults(func=validate_classifier)
+
+    args = parser.parse_args(argv)
+    # 번들 리소스의 상대 경로(static/, uploads/, *.joblib) 기준으로 실행
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
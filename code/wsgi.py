@@ -0,0 +1,15 @@
+"""
+프로덕션 WSGI 진입점.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+gunicorn.conf.py의 preload_app으로 마스터 프로세스가 이 모듈을 한 번 import해 모델을 로드한 뒤 워커를 포크하므로,
+워커들은 BiSeNet, facer, KMeans 가중치를 copy-on-write로 공유하고 각자 다시 로드하지 않습니다.
+마스터에서는 추론을 실행하지 않습니다 (포크 전에 만들어진 OpenMP 스레드 풀은 자식에서 쓸 수 없음).
+모델들은 백그라운드 스레드에서 동시에 로드되지만, 스레드는 포크로 상속되지 않으므로 포크 전에 모두 끝날 때까지 기다립니다.
+"""
+import app as server
+
+server.load_models(wait=True)
+
+application = server.app